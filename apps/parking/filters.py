@@ -0,0 +1,16 @@
+import django_filters
+
+from .models import Alert
+
+
+class AlertFilter(django_filters.FilterSet):
+    """Alert list filters, shared with the bulk acknowledge/resolve endpoints."""
+
+    zone_code = django_filters.CharFilter(field_name="device__parking_zone__code")
+    facility = django_filters.NumberFilter(
+        field_name="device__parking_zone__parking_facility_id"
+    )
+
+    class Meta:
+        model = Alert
+        fields = ["status", "severity", "alert_type", "device__device_code"]
@@ -0,0 +1,40 @@
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.parking.services.archive import archive_closed_days, archive_day, archive_dir
+from apps.parking.services.partitions import TIMESERIES_MODELS
+
+class Command(BaseCommand):
+    help = (
+        "Move closed days of Telemetry/ParkingLog rows older than "
+        "TIMESERIES_ARCHIVE_AFTER_DAYS into the columnar .npy archive"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=list(TIMESERIES_MODELS), action="append")
+        parser.add_argument("--day", help="YYYY-MM-DD: archive only this day")
+        parser.add_argument("--after-days", type=int, help="override the hot window for this run")
+
+    def handle(self, *args, **options):
+        day = None
+        if options["day"]:
+            try:
+                day = datetime.strptime(options["day"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--day must be YYYY-MM-DD")
+
+        for kind in options["kind"] or list(TIMESERIES_MODELS):
+            if day is not None:
+                moved = {day: archive_day(kind, day)}
+            else:
+                moved = archive_closed_days(kind, options["after_days"])
+
+            size = 0
+            for root, _, files in os.walk(archive_dir(kind)):
+                size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+            self.stdout.write(
+                f"{kind}: archived_days={len(moved)} rows={sum(moved.values())} "
+                f"archive_bytes={size}"
+            )
+        self.stdout.write(self.style.SUCCESS("Archive done."))
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from apps.parking.models import ParkingFacility, ParkingZone, Device
+from apps.parking.services.ingest import ingest_telemetry
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare telemetry ingest throughput of concurrent writers on the "
+        "default SQLite profile (rollback journal, deferred transactions, each "
+        "request committing its own batch) and on the configured profile (WAL "
+        "pragmas, immediate transactions, single writer with group commit). "
+        "Runs on a scratch database file created from the migrations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--batches", type=int, default=50, help="Batches per thread.")
+        parser.add_argument("--batch-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            self.stderr.write("Only meaningful on SQLite.")
+            return
+
+        tuned_options = dict(connection.settings_dict.get("OPTIONS", {}))
+        old_name = connection.settings_dict["NAME"]
+        scratch = tempfile.mkdtemp()
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(
+            scratch, "bench.sqlite3"
+        )
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            # cache and heartbeat buffer stay in memory, so only SQLite is measured
+            with override_settings(
+                CACHES={
+                    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+                },
+                HEARTBEAT_BUFFER_BACKEND="memory",
+            ):
+                results = {}
+                for name, db_options, single_writer in (
+                    ("default", {}, False),
+                    ("tuned", tuned_options, True),
+                ):
+                    results[name] = self._run(name, db_options, single_writer, options)
+        finally:
+            connection.settings_dict["OPTIONS"] = tuned_options
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            for filename in os.listdir(scratch):
+                os.remove(os.path.join(scratch, filename))
+            os.rmdir(scratch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"speedup x{results['tuned'] / results['default']:.1f}")
+        )
+
+    def _devices(self, name, count):
+        facility = ParkingFacility.objects.create(name=f"bench {name}")
+        zone = ParkingZone.objects.create(
+            parking_facility=facility, name=name, code=f"BENCH-{name.upper()}"
+        )
+        return Device.objects.bulk_create(
+            [
+                Device(parking_zone=zone, device_code=f"BENCH-{name.upper()}-{i:04d}")
+                for i in range(count)
+            ]
+        )
+
+    def _run(self, name, db_options, single_writer, options):
+        batches, batch_size = options["batches"], options["batch_size"]
+        # fresh devices per profile, so both write the same number of new rows
+        devices = self._devices(name, options["threads"])
+
+        # journal_mode is stored in the file; the tuned profile switches it to
+        # WAL again from its init_command
+        connection.settings_dict["OPTIONS"] = db_options
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=DELETE")
+        connection.close()
+
+        inserted, failed = [], []
+        start = timezone.now() - timedelta(days=1)
+
+        def post(device):
+            # one gateway posting batch after batch; a "database is locked"
+            # batch is lost, as it would be for a real request
+            for batch in range(batches):
+                base = start + timedelta(seconds=batch * batch_size)
+                records = [
+                    {
+                        "device": device,
+                        "voltage": 220.0,
+                        "current": 1.5,
+                        "power_factor": 0.95,
+                        "timestamp": base + timedelta(seconds=i),
+                    }
+                    for i in range(batch_size)
+                ]
+                try:
+                    inserted.append(ingest_telemetry(records)["inserted"])
+                except OperationalError:
+                    failed.append(batch)
+            connection.close()
+
+        with override_settings(INGEST_SINGLE_WRITER=single_writer):
+            threads = [threading.Thread(target=post, args=(d,)) for d in devices]
+            t0 = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - t0
+
+        rows = sum(inserted)
+        self.stdout.write(
+            f"{name:<8} {elapsed:8.3f}s  {rows:>8,} rows  {rows / elapsed:10,.0f} rows/sec"
+            f"  {len(failed)} of {len(devices) * batches} batches failed"
+        )
+        return rows / elapsed
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.parking.models import ParkingFacility, ParkingZone, Device, Telemetry
+from apps.parking.serializer import TelemetrySerializer, TelemetryValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/sec of the telemetry list rendered as it was before the "
+        "fast path (model serializer, one device query per row), through the "
+        "model serializer with select_related, and through the values() fast "
+        "path. Runs on a scratch database created from the migrations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--devices", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        # never the live database: filling it would hold its write lock for
+        # the whole insert
+        old_name = connection.settings_dict["NAME"]
+        scratch = tempfile.mkdtemp()
+        if connection.vendor == "sqlite":
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(
+                scratch, "bench.sqlite3"
+            )
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self._run(options["rows"], options["devices"], options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def _run(self, rows, devices, repeat):
+        facility = ParkingFacility.objects.create(name="bench")
+        zone = ParkingZone.objects.create(
+            parking_facility=facility, name="bench", code="BENCH-LIST"
+        )
+        device_objs = Device.objects.bulk_create(
+            [
+                Device(parking_zone=zone, device_code=f"BENCH-LIST-{i:04d}")
+                for i in range(devices)
+            ]
+        )
+        start = timezone.now() - timedelta(days=1)
+        Telemetry.objects.bulk_create(
+            [
+                Telemetry(
+                    device=device_objs[i % devices],
+                    voltage=220.0 + i % 10,
+                    current=1.5,
+                    power_factor=0.95,
+                    timestamp=start + timedelta(milliseconds=i),
+                )
+                for i in range(rows)
+            ],
+            batch_size=2000,
+        )
+
+        qs = Telemetry.objects.filter(device__parking_zone=zone).order_by("timestamp", "id")
+        renderer = JSONRenderer()
+
+        def baseline_path():
+            # the list before the fast path: device_code lazily loads the
+            # device of every row
+            return renderer.render(TelemetrySerializer(qs, many=True).data)
+
+        def serializer_path():
+            data = TelemetrySerializer(qs.select_related("device"), many=True).data
+            return renderer.render(data)
+
+        def values_path():
+            return renderer.render(list(TelemetryValuesSerializer.values(qs)))
+
+        results = {}
+        for name, fn in (
+            ("baseline", baseline_path),
+            ("serializer", serializer_path),
+            ("values", values_path),
+        ):
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = rows / best
+            self.stdout.write(f"{name:<10} {best:8.3f}s  {rows / best:12,.0f} rows/sec")
+
+        self.stdout.write(
+            f"values vs serializer with select_related: "
+            f"x{results['values'] / results['serializer']:.1f}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"speedup x{results['values'] / results['baseline']:.1f} over the baseline"
+            )
+        )
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.parking.models import TimeSeriesPartition
+from apps.parking.services.partitions import (
+    TIMESERIES_MODELS,
+    detach_closed_months,
+    detach_month,
+    drop_partition,
+)
+
+class Command(BaseCommand):
+    help = (
+        "Move closed months of Telemetry/ParkingLog rows into per-month SQLite "
+        "files (default), or list/drop detached months"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=list(TIMESERIES_MODELS), action="append")
+        parser.add_argument("--month", help="YYYY-MM: detach (or with --drop, drop) only this month")
+        parser.add_argument("--hot-months", type=int, help="closed months kept in the main tables")
+        parser.add_argument("--drop", action="store_true", help="delete the partition file of --month")
+        parser.add_argument("--list", action="store_true", help="show the partition catalog")
+
+    def handle(self, *args, **options):
+        kinds = options["kind"] or list(TIMESERIES_MODELS)
+
+        if options["list"]:
+            for partition in TimeSeriesPartition.objects.filter(kind__in=kinds).order_by("kind", "month"):
+                self.stdout.write(f"{partition}  {partition.path}")
+            return
+
+        month = None
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--month must be YYYY-MM")
+
+        if options["drop"]:
+            if month is None:
+                raise CommandError("--drop needs --month")
+            for partition in TimeSeriesPartition.objects.filter(kind__in=kinds, month=month):
+                drop_partition(partition)
+                self.stdout.write(f"dropped {partition}")
+            return
+
+        for kind in kinds:
+            if month is not None:
+                moved = {month: detach_month(kind, month)}
+            else:
+                moved = detach_closed_months(kind, options["hot_months"])
+            for m, count in moved.items():
+                self.stdout.write(f"{kind} {m:%Y-%m}: moved={count}")
+        self.stdout.write(self.style.SUCCESS("Partitioning done."))
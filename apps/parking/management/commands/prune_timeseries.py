@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from apps.parking.services.partitions import TIMESERIES_MODELS
+from apps.parking.services.retention import (
+    PRUNE_BATCH_SIZE,
+    enable_incremental_vacuum,
+    prune_timeseries,
+)
+
+class Command(BaseCommand):
+    help = (
+        "Delete Telemetry/ParkingLog rows older than the retention policy "
+        "(TIMESERIES_RETENTION) after folding them into the rollup tables"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=list(TIMESERIES_MODELS), action="append")
+        parser.add_argument("--days", type=int, help="override the retention for this run; ingest keeps refusing rows before the cutoff applied")
+        parser.add_argument("--batch-size", type=int, default=PRUNE_BATCH_SIZE)
+        parser.add_argument(
+            "--enable-incremental-vacuum",
+            action="store_true",
+            help="switch SQLite to auto_vacuum=INCREMENTAL first (one full VACUUM)",
+        )
+
+    def handle(self, *args, **options):
+        if options["enable_incremental_vacuum"]:
+            enable_incremental_vacuum()
+
+        result = prune_timeseries(options["kind"], options["days"], options["batch_size"])
+        for kind in options["kind"] or TIMESERIES_MODELS:
+            self.stdout.write(
+                f"{kind}: deleted={result[kind]['deleted']} "
+                f"dropped_partitions={result[kind]['dropped_partitions']} "
+                f"before {result[kind]['cutoff']}"
+            )
+
+        released = result["released_pages"]
+        if released is None:
+            self.stdout.write("Space not reclaimed: run once with --enable-incremental-vacuum.")
+        else:
+            self.stdout.write(f"released_pages={released}")
+        self.stdout.write(self.style.SUCCESS("Prune done."))
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_current_state(apps, schema_editor):
+    Device = apps.get_model("parking", "Device")
+    ParkingLog = apps.get_model("parking", "ParkingLog")
+    Telemetry = apps.get_model("parking", "Telemetry")
+    DeviceCurrentState = apps.get_model("parking", "DeviceCurrentState")
+
+    latest_log = ParkingLog.objects.filter(device=OuterRef("pk")).order_by("-timestamp")
+    latest_tel = Telemetry.objects.filter(device=OuterRef("pk")).order_by("-timestamp")
+    rows = Device.objects.annotate(
+        is_occupied=Subquery(latest_log.values("is_occupied")[:1]),
+        occupancy_at=Subquery(latest_log.values("timestamp")[:1]),
+        voltage=Subquery(latest_tel.values("voltage")[:1]),
+        current=Subquery(latest_tel.values("current")[:1]),
+        power_factor=Subquery(latest_tel.values("power_factor")[:1]),
+        telemetry_at=Subquery(latest_tel.values("timestamp")[:1]),
+    ).values(
+        "pk",
+        "is_occupied",
+        "occupancy_at",
+        "voltage",
+        "current",
+        "power_factor",
+        "telemetry_at",
+    )
+
+    states = []
+    for row in rows.iterator(chunk_size=1000):
+        if row["occupancy_at"] is None and row["telemetry_at"] is None:
+            continue
+        states.append(DeviceCurrentState(device_id=row.pop("pk"), **row))
+        if len(states) >= 1000:
+            DeviceCurrentState.objects.bulk_create(states)
+            states = []
+    DeviceCurrentState.objects.bulk_create(states)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0007_alert_created_at_alert_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceCurrentState',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='current_state', serialize=False, to='parking.device')),
+                ('is_occupied', models.BooleanField(blank=True, null=True)),
+                ('occupancy_at', models.DateTimeField(blank=True, null=True)),
+                ('voltage', models.FloatField(blank=True, null=True)),
+                ('current', models.FloatField(blank=True, null=True)),
+                ('power_factor', models.FloatField(blank=True, null=True)),
+                ('telemetry_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_occupied', 'device'], name='parking_dev_is_occu_920762_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_current_state, migrations.RunPython.noop),
+    ]
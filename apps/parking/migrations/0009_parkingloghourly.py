@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour
+
+
+def backfill_hourly(apps, schema_editor):
+    ParkingLog = apps.get_model("parking", "ParkingLog")
+    ParkingLogHourly = apps.get_model("parking", "ParkingLogHourly")
+
+    rows = (
+        ParkingLog.objects.annotate(hour=TruncHour("timestamp"))
+        .values("device_id", "device__parking_zone_id", "hour")
+        .annotate(
+            total_events=Count("id"),
+            occupied_events=Count("id", filter=Q(is_occupied=True)),
+        )
+        .order_by()
+    )
+
+    buckets = []
+    for row in rows.iterator(chunk_size=2000):
+        buckets.append(
+            ParkingLogHourly(
+                device_id=row["device_id"],
+                parking_zone_id=row["device__parking_zone_id"],
+                hour=row["hour"],
+                total_events=row["total_events"],
+                occupied_events=row["occupied_events"],
+            )
+        )
+        if len(buckets) >= 1000:
+            ParkingLogHourly.objects.bulk_create(buckets)
+            buckets = []
+    ParkingLogHourly.objects.bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0008_devicecurrentstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParkingLogHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('total_events', models.PositiveIntegerField(default=0)),
+                ('occupied_events', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_usage', to='parking.device')),
+                ('parking_zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_usage', to='parking.parkingzone')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='parking_par_hour_aef88f_idx'), models.Index(fields=['parking_zone', 'hour'], name='parking_par_parking_73a893_idx')],
+                'unique_together': {('device', 'hour')},
+            },
+        ),
+        migrations.RunPython(backfill_hourly, migrations.RunPython.noop),
+    ]
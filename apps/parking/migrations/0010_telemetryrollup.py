@@ -0,0 +1,94 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+
+METRICS = ("voltage", "current", "power_factor")
+
+
+def backfill_rollups(apps, schema_editor):
+    Telemetry = apps.get_model("parking", "Telemetry")
+    TelemetryRollup = apps.get_model("parking", "TelemetryRollup")
+
+    def build(resolution, rows):
+        buckets = []
+        for row in rows.iterator(chunk_size=2000):
+            obj = TelemetryRollup(
+                device_id=row["device_id"],
+                resolution=resolution,
+                bucket=row["b"],
+                samples=row["n"],
+            )
+            for metric in METRICS:
+                setattr(obj, f"{metric}_min", row[f"{metric}_lo"])
+                setattr(obj, f"{metric}_max", row[f"{metric}_hi"])
+                setattr(obj, f"{metric}_sum", row[f"{metric}_total"])
+            buckets.append(obj)
+            if len(buckets) >= 1000:
+                TelemetryRollup.objects.bulk_create(buckets)
+                buckets = []
+        TelemetryRollup.objects.bulk_create(buckets)
+
+    aggregates = {"n": Count("id")}
+    for metric in METRICS:
+        aggregates[f"{metric}_lo"] = Min(metric)
+        aggregates[f"{metric}_hi"] = Max(metric)
+        aggregates[f"{metric}_total"] = Sum(metric)
+    build(
+        "1m",
+        Telemetry.objects.annotate(b=TruncMinute("timestamp"))
+        .values("device_id", "b")
+        .annotate(**aggregates)
+        .order_by(),
+    )
+
+    aggregates = {"n": Sum("samples")}
+    for metric in METRICS:
+        aggregates[f"{metric}_lo"] = Min(f"{metric}_min")
+        aggregates[f"{metric}_hi"] = Max(f"{metric}_max")
+        aggregates[f"{metric}_total"] = Sum(f"{metric}_sum")
+    for resolution, previous, trunc in (("1h", "1m", TruncHour), ("1d", "1h", TruncDay)):
+        build(
+            resolution,
+            TelemetryRollup.objects.filter(resolution=previous)
+            .annotate(b=trunc("bucket"))
+            .values("device_id", "b")
+            .annotate(**aggregates)
+            .order_by(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0009_parkingloghourly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1m', '1 minute'), ('1h', '1 hour'), ('1d', '1 day')], max_length=2)),
+                ('bucket', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('voltage_min', models.FloatField()),
+                ('voltage_max', models.FloatField()),
+                ('voltage_sum', models.FloatField()),
+                ('current_min', models.FloatField()),
+                ('current_max', models.FloatField()),
+                ('current_sum', models.FloatField()),
+                ('power_factor_min', models.FloatField()),
+                ('power_factor_max', models.FloatField()),
+                ('power_factor_sum', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_rollups', to='parking.device')),
+            ],
+            options={
+                'unique_together': {('device', 'resolution', 'bucket')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
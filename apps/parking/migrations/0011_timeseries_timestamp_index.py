@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0010_telemetryrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parkinglog',
+            index=models.Index(fields=['timestamp'], name='parking_par_timesta_a4e277_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telemetry',
+            index=models.Index(fields=['timestamp'], name='parking_tel_timesta_aba6d8_idx'),
+        ),
+    ]
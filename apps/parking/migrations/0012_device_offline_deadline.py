@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+from datetime import timedelta
+
+import apps.parking.models
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_deadlines(apps, schema_editor):
+    # devices that already went quiet get a past deadline and are picked up by
+    # the next check; never seen devices keep the default (now + threshold)
+    Device = apps.get_model("parking", "Device")
+    Device.objects.filter(last_seen__isnull=False).update(
+        offline_deadline=F("last_seen") + timedelta(minutes=2)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0011_timeseries_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='offline_deadline',
+            field=models.DateTimeField(blank=True, db_index=True, default=apps.parking.models.default_offline_deadline, null=True),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def dedupe_active_alerts(apps, schema_editor):
+    # keep the newest ACTIVE alert of every (device, alert_type) with the
+    # earliest first trigger of the group, resolve the others
+    Alert = apps.get_model("parking", "Alert")
+    groups = (
+        Alert.objects.filter(status="ACTIVE")
+        .values("device_id", "alert_type")
+        .annotate(n=Count("id"), keep=Max("id"), first=Min("first_triggered_at"))
+        .filter(n__gt=1)
+    )
+    for group in groups:
+        Alert.objects.filter(pk=group["keep"]).update(first_triggered_at=group["first"])
+        Alert.objects.filter(
+            device_id=group["device_id"],
+            alert_type=group["alert_type"],
+            status="ACTIVE",
+        ).exclude(pk=group["keep"]).update(status="RESOLVED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0012_device_offline_deadline'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_active_alerts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'ACTIVE')), fields=('device', 'alert_type'), name='unique_active_alert_per_device_type'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0013_alert_unique_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
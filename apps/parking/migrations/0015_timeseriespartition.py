@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0014_alert_resolved_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeSeriesPartition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('telemetry', 'Telemetry'), ('parking_log', 'Parking log')], max_length=20)),
+                ('month', models.DateField()),
+                ('path', models.CharField(max_length=500)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0015_timeseriespartition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionCutoff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('telemetry', 'Telemetry'), ('parking_log', 'Parking log')], max_length=20, unique=True)),
+                ('cutoff', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
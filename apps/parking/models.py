@@ -1,8 +1,17 @@
+from datetime import timedelta
+
 from django.db import models
 from django.utils import timezone
 
 # Create your models here.
 
+# a device without a heartbeat for this long is reported offline
+OFFLINE_AFTER = timedelta(minutes=2)
+
+
+def default_offline_deadline():
+    return timezone.now() + OFFLINE_AFTER
+
 
 class ParkingFacility(models.Model):
     name = models.CharField(max_length=100)
@@ -34,6 +43,12 @@ class Device(models.Model):
     device_code = models.CharField(max_length=100, unique=True)  # PARK-B1-S005
     is_active = models.BooleanField(default=True)
     last_seen = models.DateTimeField(blank=True, null=True)
+    # last_seen + OFFLINE_AFTER, moved forward by every heartbeat flush and
+    # cleared once the offline alert fired; the offline check only reads
+    # devices whose deadline has passed
+    offline_deadline = models.DateTimeField(
+        blank=True, null=True, default=default_offline_deadline, db_index=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -54,6 +69,8 @@ class Telemetry(models.Model):
 
     class Meta:
         unique_together = ("device", "timestamp")
+        # unfiltered cursor pages walk this index
+        indexes = [models.Index(fields=["timestamp"])]
 
     def __str__(self):
         return f"{self.device.device_code} - {self.timestamp}"
@@ -70,11 +87,141 @@ class ParkingLog(models.Model):
 
     class Meta:
         unique_together = ("device", "timestamp")
+        # unfiltered cursor pages walk this index
+        indexes = [models.Index(fields=["timestamp"])]
 
     def __str__(self):
         return f"{self.device.device_code} - {self.is_occupied} @ {self.timestamp}"
 
 
+class DeviceCurrentState(models.Model):
+    """
+    Latest occupancy and telemetry reading per device, kept up to date by the
+    ingestion paths so "current" dashboards don't need latest-per-device scans.
+    """
+
+    device = models.OneToOneField(
+        Device,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="current_state",
+    )
+    is_occupied = models.BooleanField(blank=True, null=True)
+    occupancy_at = models.DateTimeField(blank=True, null=True)
+    voltage = models.FloatField(blank=True, null=True)
+    current = models.FloatField(blank=True, null=True)
+    power_factor = models.FloatField(blank=True, null=True)
+    telemetry_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["is_occupied", "device"])]
+
+    def __str__(self):
+        return f"{self.device_id} occupied={self.is_occupied} @ {self.occupancy_at}"
+
+class ParkingLogHourly(models.Model):
+    """
+    Per device and hour rollup of ParkingLog, recomputed from the raw rows of
+    every bucket an ingest touches, so it always equals the raw aggregation.
+    """
+
+    parking_zone = models.ForeignKey(
+        ParkingZone, on_delete=models.CASCADE, related_name="hourly_usage"
+    )
+    device = models.ForeignKey(
+        Device, on_delete=models.CASCADE, related_name="hourly_usage"
+    )
+    hour = models.DateTimeField()
+    total_events = models.PositiveIntegerField(default=0)
+    occupied_events = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("device", "hour")
+        indexes = [
+            models.Index(fields=["hour"]),
+            models.Index(fields=["parking_zone", "hour"]),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id} {self.hour} {self.occupied_events}/{self.total_events}"
+
+class TelemetryRollup(models.Model):
+    """
+    Min/max/sum/count of voltage, current and power_factor per device and
+    bucket at 1 minute, 1 hour and 1 day resolution, maintained at ingest time.
+    """
+
+    MINUTE = "1m"
+    HOUR = "1h"
+    DAY = "1d"
+    RESOLUTION_CHOICES = [(MINUTE, "1 minute"), (HOUR, "1 hour"), (DAY, "1 day")]
+
+    device = models.ForeignKey(
+        Device, on_delete=models.CASCADE, related_name="telemetry_rollups"
+    )
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()
+    samples = models.PositiveIntegerField(default=0)
+    voltage_min = models.FloatField()
+    voltage_max = models.FloatField()
+    voltage_sum = models.FloatField()
+    current_min = models.FloatField()
+    current_max = models.FloatField()
+    current_sum = models.FloatField()
+    power_factor_min = models.FloatField()
+    power_factor_max = models.FloatField()
+    power_factor_sum = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("device", "resolution", "bucket")
+
+    def __str__(self):
+        return f"{self.device_id} {self.resolution} {self.bucket} n={self.samples}"
+
+
+class TimeSeriesPartition(models.Model):
+    """
+    Catalog of closed months of Telemetry/ParkingLog rows moved out of the
+    main tables into their own SQLite file, one file per kind and month.
+    """
+
+    TELEMETRY = "telemetry"
+    PARKING_LOG = "parking_log"
+    KIND_CHOICES = [(TELEMETRY, "Telemetry"), (PARKING_LOG, "Parking log")]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    month = models.DateField()  # first day of the month
+    path = models.CharField(max_length=500)
+    rows = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("kind", "month")
+
+    def __str__(self):
+        return f"{self.kind} {self.month:%Y-%m} ({self.rows} rows)"
+
+
+class RetentionCutoff(models.Model):
+    """
+    Latest cutoff prune_timeseries applied per kind. Raw rows before it are
+    folded and deleted even when the prune ran with a shorter retention than
+    TIMESERIES_RETENTION, so ingest refuses rows older than it too.
+    """
+
+    kind = models.CharField(
+        max_length=20, choices=TimeSeriesPartition.KIND_CHOICES, unique=True
+    )
+    cutoff = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} pruned before {self.cutoff:%Y-%m-%d}"
+
 
 class ParkingTarget(models.Model):
     parking_zone = models.ForeignKey(
@@ -122,9 +269,20 @@ class Alert(models.Model):
 
     first_triggered_at = models.DateTimeField(default=timezone.now)
     last_triggered_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # at most one open alert per device and type; the alert upsert
+            # uses it as its ON CONFLICT target
+            models.UniqueConstraint(
+                fields=["device", "alert_type"],
+                condition=models.Q(status="ACTIVE"),
+                name="unique_active_alert_per_device_type",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.device.device_code} - {self.alert_type} ({self.severity}) - {self.status}"
\ No newline at end of file
@@ -0,0 +1,101 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+# keyset pagination for the time-series lists: every page is a range scan
+# from the cursor position, so deep pages cost the same as the first one
+class TimeSeriesCursorPagination(CursorPagination):
+    """
+    Cursor pagination on the composite key (timestamp, id). DRF's
+    CursorPagination only compares the first ordering field and skips rows
+    sharing its value with an offset, capped at offset_cutoff; a batch of
+    more rows with the same timestamp could not be paged through. Here the
+    cursor holds both values and the next page starts strictly after the
+    pair, so any number of ties pages without offsets.
+    """
+
+    ordering = ("timestamp", "id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        field, tiebreak = self.ordering
+        if reverse:
+            queryset = queryset.order_by(f"-{field}", f"-{tiebreak}")
+        else:
+            queryset = queryset.order_by(field, tiebreak)
+
+        if position is not None:
+            value, key = position
+            after = "lt" if reverse else "gt"
+            # a range on the indexed column, narrowed at the boundary value
+            queryset = queryset.filter(
+                Q(**{f"{field}__{after}e": value})
+                & (Q(**{f"{field}__{after}": value}) | Q(**{f"{tiebreak}__{after}": key}))
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+
+        first = self._get_position_from_instance(self.page[0]) if self.page else None
+        last = self._get_position_from_instance(self.page[-1]) if self.page else None
+        # the pages this one was reached from exist; from an empty page the
+        # way back is the first (or last) page
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else position is not None
+        self.next_position = last
+        self.previous_position = first
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.previous_position)
+        )
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        value, _, key = cursor.position.rpartition("|")
+        value = parse_datetime(value)
+        if value is None or not key.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=(value, int(key)))
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            value, key = cursor.position
+            cursor = cursor._replace(position=f"{value.isoformat()}|{key}")
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering=None):
+        field, tiebreak = self.ordering
+        if isinstance(instance, dict):
+            return instance[field], instance[tiebreak]
+        return getattr(instance, field), getattr(instance, tiebreak)
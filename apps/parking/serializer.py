@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import F
 from django.utils import timezone
 from django.db import transaction
 from .models import (
@@ -9,11 +10,34 @@ from .models import (
     ParkingLog,
     ParkingTarget,
     Alert,
+    TimeSeriesPartition,
 )
+from .services.ingest import (
+    resolve_device_codes,
+    ingest_telemetry,
+    ingest_parking_logs,
+    telemetry_written,
+    parking_logs_written,
+)
+from .services.heartbeat import record_heartbeats
+from .services.response_cache import bump_zones, device_zones
+from .services.retention import writable
+from .services.writer import run_write
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer taking an optional `fields` argument that limits its output."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 # parking facility serializer
-class ParkingFacilitySerializer(serializers.ModelSerializer):
+class ParkingFacilitySerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = ParkingFacility
         fields = [
@@ -26,7 +50,7 @@ class ParkingFacilitySerializer(serializers.ModelSerializer):
 
 
 # parking zone serializer
-class ParkingZoneSerializer(serializers.ModelSerializer):
+class ParkingZoneSerializer(DynamicFieldsModelSerializer):
 
     class Meta:
         model = ParkingZone
@@ -41,7 +65,7 @@ class ParkingZoneSerializer(serializers.ModelSerializer):
 
 
 # device serializer
-class DeviceSerializer(serializers.ModelSerializer):
+class DeviceSerializer(DynamicFieldsModelSerializer):
 
     class Meta:
         model = Device
@@ -56,6 +80,22 @@ class DeviceSerializer(serializers.ModelSerializer):
         ]
 
 
+# time-series timestamp validators
+def validate_timestamp_not_future(value):
+    if value > timezone.now() + timezone.timedelta(minutes=5):
+        raise serializers.ValidationError("Invalid timestamp (too far in the future).")
+    return value
+
+
+def validate_timestamp_writable(kind, value):
+    # the bulk endpoints skip these rows instead, like duplicates
+    if not writable(kind, [value])[0]:
+        raise serializers.ValidationError(
+            "Invalid timestamp (older than the data kept in the main table)."
+        )
+    return value
+
+
 # telemetry serializer
 class TelemetrySerializer(serializers.ModelSerializer):
 
@@ -78,46 +118,78 @@ class TelemetrySerializer(serializers.ModelSerializer):
         ]
 
     def validate_timestamp(self, value):
-        if value > timezone.now() + timezone.timedelta(minutes=5):
-            raise serializers.ValidationError(
-                "Invalid timestamp (too far in the future)."
-            )
-        return value
+        return validate_timestamp_writable(
+            TimeSeriesPartition.TELEMETRY, validate_timestamp_not_future(value)
+        )
 
+    def create(self, validated_data):
+        create = super().create
+
+        # one row from a sensor goes through the single writer like a batch
+        def write():
+            with transaction.atomic():
+                instance = create(validated_data)
+                return instance, telemetry_written([instance])
+
+        instance, topics = run_write(write)
+        if topics:
+            bump_zones(device_zones([instance.device]), topics)
+        # like a bulk post: the device is seen again (its offline alert was
+        # just resolved, the offline check must be able to raise a new one)
+        record_heartbeats([instance.device_id], timezone.now())
+        return instance
+
+
+# bulk serializers
+class BulkRecordsMixin:
+    """
+    Resolves every record's device_code with one IN query for the whole batch
+    instead of one SlugRelatedField lookup per record.
+    """
+
+    def validate_records(self, records):
+        devices = resolve_device_codes(rec["device_code"] for rec in records)
+
+        errors = []
+        for rec in records:
+            device = devices.get(rec["device_code"])
+            if device is None:
+                errors.append(
+                    {
+                        "device_code": [
+                            f"Object with device_code={rec['device_code']} does not exist."
+                        ]
+                    }
+                )
+            else:
+                rec["device"] = device
+                errors.append({})
 
-# Telemetry bulk serializer
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return records
 
 
-class TelemetryBulkSerializer(serializers.Serializer):
-    records = TelemetrySerializer(many=True, write_only=True)
+# async bulk envelope: only the shape is checked before the batch is queued
+class BulkEnvelopeSerializer(serializers.Serializer):
+    records = serializers.ListField(child=serializers.DictField(), allow_empty=False)
 
-    def create(self, validated_data):
-        records = validated_data["records"]
 
-        objs = []
-        for rec in records:
-            objs.append(
-                Telemetry(
-                    device=rec["device"],
-                    voltage=rec["voltage"],
-                    current=rec["current"],
-                    power_factor=rec["power_factor"],
-                    timestamp=rec["timestamp"],
-                )
-            )
+# telemetry bulk serializer; a record holds plain fields only, so no
+# per-record queries are made
+class TelemetryRecordSerializer(serializers.Serializer):
+    device_code = serializers.CharField(max_length=100)
+    voltage = serializers.FloatField()
+    current = serializers.FloatField()
+    power_factor = serializers.FloatField()
+    timestamp = serializers.DateTimeField(validators=[validate_timestamp_not_future])
 
-        with transaction.atomic():
-            created = Telemetry.objects.bulk_create(objs, ignore_conflicts=True)
 
-        device_ids = list({o.device_id for o in objs})
-        now = timezone.now()
-        Device.objects.filter(id__in=device_ids).update(last_seen=now)
+class TelemetryBulkSerializer(BulkRecordsMixin, serializers.Serializer):
+    records = TelemetryRecordSerializer(many=True, write_only=True)
 
-        return {
-            "inserted": len(created),
-            "received": len(objs),
-            "skipped": len(objs) - len(created),
-        }
+    def create(self, validated_data):
+        return ingest_telemetry(validated_data["records"])
 
 
 # parking log serializer
@@ -139,11 +211,26 @@ class ParkingLogSerializer(serializers.ModelSerializer):
         ]
 
     def validate_timestamp(self, value):
-        if value > timezone.now() + timezone.timedelta(minutes=5):
-            raise serializers.ValidationError(
-                "Invalid timestamp (too far in the future)."
-            )
-        return value
+        return validate_timestamp_writable(
+            TimeSeriesPartition.PARKING_LOG, validate_timestamp_not_future(value)
+        )
+
+    def create(self, validated_data):
+        create = super().create
+
+        # one row from a sensor goes through the single writer like a batch
+        def write():
+            with transaction.atomic():
+                instance = create(validated_data)
+                return instance, parking_logs_written([instance])
+
+        instance, topics = run_write(write)
+        if topics:
+            bump_zones(device_zones([instance.device]), topics)
+        # like a bulk post: the device is seen again (its offline alert was
+        # just resolved, the offline check must be able to raise a new one)
+        record_heartbeats([instance.device_id], timezone.now())
+        return instance
 
 
 # parking target serializer
@@ -178,6 +265,73 @@ class AlertSerializer(serializers.ModelSerializer):
             "message",
             "first_triggered_at",
             "last_triggered_at",
+            "resolved_at",
             "created_at",
             "updated_at",
         ]
+
+
+# alert bulk acknowledge/resolve serializer
+class AlertBulkActionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=10000,
+    )
+
+
+# parking log bulk serializer
+class ParkingLogRecordSerializer(serializers.Serializer):
+    device_code = serializers.CharField(max_length=100)
+    is_occupied = serializers.BooleanField()
+    timestamp = serializers.DateTimeField(validators=[validate_timestamp_not_future])
+
+
+class ParkingLogBulkSerializer(BulkRecordsMixin, serializers.Serializer):
+    records = ParkingLogRecordSerializer(many=True, write_only=True)
+
+    def create(self, validated_data):
+        return ingest_parking_logs(validated_data["records"])
+
+
+# read-only values() serializers for the hot list endpoints
+
+
+class ValuesSerializer:
+    """
+    Read-only list serializer that selects exactly the output columns with
+    values() (related columns joined in the same query) and returns the row
+    dicts as they are, instead of building a model instance and running DRF
+    fields for every row. Output matches the model serializer's fields.
+    """
+
+    fields = []
+    # output name -> ORM lookup for columns that live on a related table
+    relations = {}
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        fields = fields or cls.fields
+        return queryset.annotate(
+            **{
+                name: F(lookup)
+                for name, lookup in cls.relations.items()
+                if name in fields
+            }
+        ).values(*fields)
+
+
+class TelemetryValuesSerializer(ValuesSerializer):
+    fields = TelemetrySerializer.Meta.fields
+    relations = {"device_code": "device__device_code"}
+
+
+class ParkingLogValuesSerializer(ValuesSerializer):
+    fields = ParkingLogSerializer.Meta.fields
+    relations = {"device_code": "device__device_code"}
+
+
+class AlertValuesSerializer(ValuesSerializer):
+    fields = AlertSerializer.Meta.fields
+    relations = {"device_code": "device__device_code"}
@@ -1,32 +1,121 @@
+from django.db import connection
 from django.utils import timezone
 from ..models import Alert
+from .response_cache import ALERTS_TOPIC, bump_devices
+from .upsert import insert_new_rows
+
+# the partial unique index on ACTIVE alerts both statements target
+ACTIVE_ALERT_CONSTRAINT = "unique_active_alert_per_device_type"
+# alerts per UPDATE statement (4 parameters each)
+TOUCH_BATCH_SIZE = 500
+TOUCH_COLUMNS = ["device_id", "alert_type", "severity", "message"]
+
+
+def active_alert_condition():
+    """
+    The index predicate as SQL, rendered from the constraint the way the
+    migration created it: a conflict target must repeat it literally.
+    """
+    constraint = next(
+        c for c in Alert._meta.constraints if c.name == ACTIVE_ALERT_CONSTRAINT
+    )
+    return constraint._get_condition_sql(Alert, connection.schema_editor())
+
+
+def _touch_sql(rows, condition):
+    quote = connection.ops.quote_name
+    table = quote(Alert._meta.db_table)
+    values = ", ".join(["(" + ", ".join(["%s"] * len(TOUCH_COLUMNS)) + ")"] * rows)
+    # "t_" names keep the CTE columns apart from the alert's in the
+    # unqualified index predicate and RETURNING list
+    touched = ", ".join(f"t_{c}" for c in TOUCH_COLUMNS)
+    returning = ", ".join(quote(f.column) for f in Alert._meta.concrete_fields)
+    return (
+        f"WITH touched ({touched}) AS (VALUES {values}) "
+        f"UPDATE {table} SET severity = touched.t_severity, "
+        "message = touched.t_message, last_triggered_at = %s, updated_at = %s "
+        f"FROM touched WHERE {table}.device_id = touched.t_device_id "
+        f"AND {table}.alert_type = touched.t_alert_type AND ({condition}) "
+        f"RETURNING {returning}"
+    )
+
+
+def _touch_alerts(alerts, now, condition):
+    """Touch the ACTIVE alert of each (device_id, alert_type, ...) tuple."""
+    ts = connection.ops.adapt_datetimefield_value(now)
+    touched = []
+    for start in range(0, len(alerts), TOUCH_BATCH_SIZE):
+        batch = alerts[start : start + TOUCH_BATCH_SIZE]
+        params = [value for alert in batch for value in alert] + [ts, ts]
+        touched += Alert.objects.raw(_touch_sql(len(batch), condition), params)
+    return touched
+
+
+def upsert_alerts(alerts, now=None):
+    """
+    Create or touch ACTIVE alerts from (device_id, alert_type, severity,
+    message) tuples. New alerts go in with INSERT ... ON CONFLICT DO NOTHING
+    RETURNING against the partial unique index, so what it returns is
+    exactly what was created; the rest are touched with UPDATE ... FROM ...
+    RETURNING. A key whose ACTIVE alert was resolved between the two
+    statements is tried again. Returns the resulting Alert rows, each with
+    a `created` flag.
+    """
+    now = now or timezone.now()
+    condition = active_alert_condition()
+    # one row per key, the last tuple wins
+    pending = {(a[0], a[1]): a for a in alerts}
+
+    result = []
+    while pending:
+        created = insert_new_rows(
+            Alert,
+            [
+                Alert(
+                    device_id=device_id,
+                    alert_type=alert_type,
+                    severity=severity,
+                    message=message,
+                    status=Alert.ACTIVE,
+                    first_triggered_at=now,
+                    last_triggered_at=now,
+                )
+                for device_id, alert_type, severity, message in pending.values()
+            ],
+            ["device", "alert_type"],
+            condition,
+        )
+        touched = []
+        for alert in created:
+            alert.created = True
+            del pending[(alert.device_id, alert.alert_type)]
+        if pending:
+            touched = _touch_alerts(list(pending.values()), now, condition)
+        for alert in touched:
+            alert.created = False
+            del pending[(alert.device_id, alert.alert_type)]
+        result += created + touched
+    return result
+
+
+def resolve_offline_alerts(device_ids, now=None):
+    """
+    Resolve the open DEVICE_OFFLINE alerts of devices that reported again,
+    with one UPDATE for the whole batch.
+    """
+    now = now or timezone.now()
+    return Alert.objects.filter(
+        device_id__in=list(device_ids),
+        alert_type=Alert.DEVICE_OFFLINE,
+        status__in=[Alert.ACTIVE, Alert.ACK],
+    ).update(status=Alert.RESOLVED, resolved_at=now, updated_at=now)
+
 
 def create_or_touch_alert(device, alert_type, severity, message):
     """
     If same (device, alert_type) is ACTIVE already -> touch last_triggered_at + message
     else create new ACTIVE alert
     """
-    now = timezone.now()
-    alert = Alert.objects.filter(
-        device=device,
-        alert_type=alert_type,
-        status=Alert.ACTIVE
-    ).first()
-
-    if alert:
-        alert.severity = severity
-        alert.message = message
-        alert.last_triggered_at = now
-        alert.save(update_fields=["severity", "message", "last_triggered_at", "updated_at"])
-        return alert, False
-
-    alert = Alert.objects.create(
-        device=device,
-        alert_type=alert_type,
-        severity=severity,
-        status=Alert.ACTIVE,
-        message=message,
-        first_triggered_at=now,
-        last_triggered_at=now,
-    )
-    return alert, True
+    [alert] = upsert_alerts([(device.id, alert_type, severity, message)])
+    bump_devices([device.id], [ALERTS_TOPIC])
+    return alert, alert.created
@@ -0,0 +1,315 @@
+import os
+import shutil
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from ..models import TimeSeriesPartition
+from .partitions import (
+    DELETE_BATCH_SIZE,
+    TIMESERIES_MODELS,
+    delete_in_pk_batches,
+    delete_partition_range,
+    iter_partition_rows,
+    month_of,
+    partitions_for,
+)
+from .rollups import floor_time, fold_raw_rows
+
+# kind -> value columns and their dtype; every day also stores id (int64) and
+# timestamp (datetime64[us], UTC)
+ARCHIVE_COLUMNS = {
+    TimeSeriesPartition.TELEMETRY: [
+        ("voltage", "f8"),
+        ("current", "f8"),
+        ("power_factor", "f8"),
+    ],
+    TimeSeriesPartition.PARKING_LOG: [("is_occupied", "?")],
+}
+
+ONE_DAY = timedelta(days=1)
+# rows converted to column arrays at a time
+ARCHIVE_CHUNK_SIZE = 5000
+
+
+def archive_dir(kind):
+    directory = getattr(
+        settings, "TIMESERIES_ARCHIVE_DIR", os.path.join(settings.BASE_DIR, "archive")
+    )
+    return os.path.join(str(directory), kind)
+
+
+def day_path(kind, day):
+    return os.path.join(archive_dir(kind), f"{day:%Y}", f"{day:%m}", f"{day:%d}")
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime(day.year, day.month, day.day))
+    return start, start + ONE_DAY
+
+
+def _to_us(dt):
+    return np.datetime64(dt.astimezone(dt_timezone.utc).replace(tzinfo=None), "us")
+
+
+def _load_day(path, names, mmap_mode="r"):
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in names
+    }
+
+
+def _value_names(kind):
+    return [name for name, _ in ARCHIVE_COLUMNS[kind]]
+
+
+def _write_day(path, arrays):
+    """
+    Write a day directory atomically: the new files go to a sibling directory
+    that replaces the old one with two renames.
+    """
+    tmp, old = path + ".tmp", path + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+    if os.path.isdir(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _column_arrays(kind, rows):
+    """
+    Column arrays of (id, device_id, *values, timestamp) tuples, converted
+    ARCHIVE_CHUNK_SIZE rows at a time so the rows never sit in a Python list
+    all together.
+    """
+    dtypes = {"id": "i8", "device_id": "i8", **dict(ARCHIVE_COLUMNS[kind])}
+    chunks = []
+    rows = iter(rows)
+    while chunk := list(islice(rows, ARCHIVE_CHUNK_SIZE)):
+        arrays = {
+            name: np.fromiter((row[i] for row in chunk), dtype=dtype, count=len(chunk))
+            for i, (name, dtype) in enumerate(dtypes.items())
+        }
+        arrays["timestamp"] = np.array(
+            [_to_us(row[-1]) for row in chunk], dtype="datetime64[us]"
+        )
+        chunks.append(arrays)
+    dtypes["timestamp"] = "datetime64[us]"
+    if not chunks:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in dtypes.items()}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in dtypes}
+
+
+def _store_day(kind, path, arrays):
+    """Merge column arrays into a day's files (creating them if needed) and rewrite them."""
+    if os.path.isdir(path):
+        previous = read_day(kind, path, mmap_mode=None)
+        arrays = {name: np.concatenate([previous[name], arrays[name]]) for name in arrays}
+
+    # one row per id (a re-run may see rows twice), sorted per device
+    _, keep = np.unique(arrays["id"], return_index=True)
+    arrays = {name: array[keep] for name, array in arrays.items()}
+    order = np.lexsort((arrays["id"], arrays["timestamp"], arrays["device_id"]))
+    arrays = {name: array[order] for name, array in arrays.items()}
+
+    device_ids, offsets = np.unique(arrays.pop("device_id"), return_index=True)
+    arrays["device_ids"] = device_ids
+    arrays["offsets"] = np.append(offsets, len(arrays["id"]))
+    _write_day(path, arrays)
+
+
+def archive_day(kind, day, batch_size=DELETE_BATCH_SIZE):
+    """
+    Move one closed day of raw rows (main table and, if its month was
+    detached, the month's partition file) into columnar .npy files: per
+    column one array sorted by (device, timestamp, id), plus the device ids
+    and their offsets so a device's rows are a contiguous slice. Files are
+    plain .npy so readers memory-map them instead of loading them.
+
+    The day's aggregates are rebuilt on its first archive only, while all its
+    raw rows are in place. The day's directory appears with a single rename;
+    from then on ingest refuses its rows (retention.writable) and readers take
+    the day from the archive only, skipping its rows still in the main table
+    or a partition. Rows committed while the day was being read are merged in
+    next, then the day is deleted from the main table one pk batch per
+    transaction and from the partition files. Re-running a day is safe.
+    Returns the number of rows moved.
+    """
+    model = TIMESERIES_MODELS[kind]
+    columns = ["id", "device_id", *_value_names(kind), "timestamp"]
+    start, end = day_bounds(day)
+    path = day_path(kind, day)
+
+    hot = model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if not os.path.isdir(path):
+        fold_raw_rows(hot)
+    hot_arrays = _column_arrays(
+        kind, hot.order_by("id").values_list(*columns).iterator(chunk_size=ARCHIVE_CHUNK_SIZE)
+    )
+    partitions = partitions_for(kind, start, end - timedelta(microseconds=1))
+    cold_arrays = _column_arrays(
+        kind, iter_partition_rows(kind, partitions, columns, start=start, end=end)
+    )
+    moved = len(hot_arrays["id"]) + len(cold_arrays["id"])
+    if not moved:
+        return 0
+    _store_day(
+        kind,
+        path,
+        {name: np.concatenate([hot_arrays[name], cold_arrays[name]]) for name in hot_arrays},
+    )
+    last_hot_id = int(hot_arrays["id"].max()) if len(hot_arrays["id"]) else None
+
+    # the day is published. A write transaction waits for a batch that
+    # passed writable() before the rename, so no row lands behind this read
+    with transaction.atomic():
+        late = hot.filter(id__gt=last_hot_id) if last_hot_id is not None else hot
+        late_arrays = _column_arrays(
+            kind, late.order_by("id").values_list(*columns).iterator(chunk_size=ARCHIVE_CHUNK_SIZE)
+        )
+    if len(late_arrays["id"]):
+        _store_day(kind, path, late_arrays)
+        moved += len(late_arrays["id"])
+
+    delete_in_pk_batches(hot, batch_size)
+    for partition in partitions:
+        delete_partition_range(kind, partition, start, end)
+    return moved
+
+
+def is_archived(kind, day):
+    return os.path.isdir(day_path(kind, day))
+
+
+def archived_until(kind):
+    """End of the newest archived day of kind, None if nothing is archived."""
+    root = archive_dir(kind)
+    if not os.path.isdir(root):
+        return None
+    for year in sorted(os.listdir(root), reverse=True):
+        for month in sorted(os.listdir(os.path.join(root, year)), reverse=True):
+            for day_name in sorted(os.listdir(os.path.join(root, year, month)), reverse=True):
+                if day_name.isdigit():
+                    return day_bounds(date(int(year), int(month), int(day_name)))[1]
+    return None
+
+
+def read_day(kind, path, mmap_mode="r"):
+    """Columns of one archived day with device_id expanded back to one per row."""
+    arrays = _load_day(
+        path, ["id", "timestamp", "device_ids", "offsets", *_value_names(kind)], mmap_mode
+    )
+    arrays["device_id"] = np.repeat(
+        arrays.pop("device_ids"), np.diff(arrays.pop("offsets"))
+    )
+    return arrays
+
+
+def archived_days(kind, start=None, end=None):
+    """Archived days overlapping [start, end), oldest first."""
+    first = floor_time(start, ONE_DAY).date() if start else None
+    last = timezone.localtime(end).date() if end else None
+    days = []
+    root = archive_dir(kind)
+    if not os.path.isdir(root):
+        return days
+    for year in sorted(os.listdir(root)):
+        for month in sorted(os.listdir(os.path.join(root, year))):
+            for day_name in sorted(os.listdir(os.path.join(root, year, month))):
+                if not day_name.isdigit():
+                    continue  # .tmp / .old directories of a write in progress
+                day = date(int(year), int(month), int(day_name))
+                if (first is None or day >= first) and (last is None or day <= last):
+                    days.append(day)
+    return days
+
+
+def iter_archive_rows(kind, columns, device_ids=None, start=None, end=None):
+    """
+    Tuples of the given columns (id, device_id, timestamp or a value column)
+    from the archive, in (timestamp, id) order. Each day is memory-mapped and
+    only the slices of the requested devices are read.
+    """
+    if device_ids is not None:
+        device_ids = set(device_ids)
+    for day in archived_days(kind, start, end):
+        arrays = _load_day(
+            day_path(kind, day),
+            ["id", "timestamp", "device_ids", "offsets", *_value_names(kind)],
+        )
+        bounds = arrays["offsets"]
+        slices = [
+            (device_id, bounds[i], bounds[i + 1])
+            for i, device_id in enumerate(arrays["device_ids"].tolist())
+            if device_ids is None or device_id in device_ids
+        ]
+        if not slices:
+            continue
+
+        index = np.concatenate([np.arange(lo, hi) for _, lo, hi in slices])
+        day_columns = {
+            name: arrays[name][index]
+            for name in ["id", "timestamp", *_value_names(kind)]
+        }
+        day_columns["device_id"] = np.repeat(
+            [device_id for device_id, _, _ in slices],
+            [hi - lo for _, lo, hi in slices],
+        )
+
+        mask = np.ones(len(index), dtype=bool)
+        if start:
+            mask &= day_columns["timestamp"] >= _to_us(start)
+        if end:
+            mask &= day_columns["timestamp"] < _to_us(end)
+        order = np.lexsort((day_columns["id"][mask], day_columns["timestamp"][mask]))
+
+        out = []
+        for name in columns:
+            values = day_columns[name][mask][order].tolist()
+            if name == "timestamp":
+                values = [v.replace(tzinfo=dt_timezone.utc) for v in values]
+            out.append(values)
+        yield from zip(*out)
+
+
+def archive_closed_days(kind, after_days=None, now=None):
+    """
+    Archive every day older than TIMESERIES_ARCHIVE_AFTER_DAYS that still has
+    raw rows in the main table or in a detached month. Returns {day: rows}.
+    """
+    model = TIMESERIES_MODELS[kind]
+    if after_days is None:
+        after_days = getattr(settings, "TIMESERIES_ARCHIVE_AFTER_DAYS", 60)
+    cutoff = floor_time((now or timezone.now()) - timedelta(days=after_days), ONE_DAY)
+
+    candidates = []
+    oldest = model.objects.filter(timestamp__lt=cutoff).aggregate(t=Min("timestamp"))["t"]
+    if oldest:
+        candidates.append(timezone.localtime(oldest).date())
+    first_partition = (
+        TimeSeriesPartition.objects.filter(kind=kind, rows__gt=0, month__lte=month_of(cutoff))
+        .order_by("month")
+        .values_list("month", flat=True)
+        .first()
+    )
+    if first_partition:
+        candidates.append(first_partition)
+    if not candidates:
+        return {}
+
+    moved = {}
+    day, last = min(candidates), timezone.localtime(cutoff).date()
+    while day < last:
+        count = archive_day(kind, day)
+        if count:
+            moved[day] = count
+        day += ONE_DAY
+    return moved
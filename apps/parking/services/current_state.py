@@ -0,0 +1,66 @@
+from django.utils import timezone
+
+from ..models import DeviceCurrentState
+
+OCCUPANCY_FIELDS = ["is_occupied", "occupancy_at", "updated_at"]
+TELEMETRY_FIELDS = ["voltage", "current", "power_factor", "telemetry_at", "updated_at"]
+
+
+def _apply(objs, ts_field, values_of, fields):
+    """
+    Move each device's state forward to the newest row of the batch. Rows older
+    than what is already stored (late arrivals, replays) leave it untouched.
+    """
+    latest = {}
+    for obj in objs:
+        current = latest.get(obj.device_id)
+        if current is None or obj.timestamp > current.timestamp:
+            latest[obj.device_id] = obj
+    if not latest:
+        return
+
+    states = DeviceCurrentState.objects.in_bulk(list(latest))
+
+    to_create, to_update = [], []
+    for device_id, obj in latest.items():
+        state = states.get(device_id)
+        if state is None:
+            state = DeviceCurrentState(device_id=device_id)
+            to_create.append(state)
+        elif getattr(state, ts_field) is None or getattr(state, ts_field) < obj.timestamp:
+            to_update.append(state)
+        else:
+            continue
+
+        setattr(state, ts_field, obj.timestamp)
+        for field, value in values_of(obj).items():
+            setattr(state, field, value)
+
+    DeviceCurrentState.objects.bulk_create(to_create, batch_size=500)
+    # bulk_update does not apply auto_now
+    now = timezone.now()
+    for state in to_update:
+        state.updated_at = now
+    DeviceCurrentState.objects.bulk_update(to_update, fields, batch_size=500)
+
+
+def apply_parking_logs(logs):
+    _apply(
+        logs,
+        "occupancy_at",
+        lambda log: {"is_occupied": log.is_occupied},
+        OCCUPANCY_FIELDS,
+    )
+
+
+def apply_telemetry(rows):
+    _apply(
+        rows,
+        "telemetry_at",
+        lambda row: {
+            "voltage": row.voltage,
+            "current": row.current,
+            "power_factor": row.power_factor,
+        },
+        TELEMETRY_FIELDS,
+    )
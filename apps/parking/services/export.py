@@ -0,0 +1,157 @@
+import csv
+import json
+from datetime import datetime
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from ..models import Device, Telemetry, ParkingLog
+from .archive import archived_days, day_bounds, iter_archive_rows
+from .partitions import (
+    exclude_ranges,
+    iter_partition_rows,
+    merge_by_timestamp,
+    month_bounds,
+    partitions_for,
+)
+
+EXPORT_CHUNK_SIZE = 2000
+# lines per chunk handed to the WSGI server
+EXPORT_LINES_PER_WRITE = 500
+
+# kind -> (model, [(output column, ORM lookup)])
+EXPORT_COLUMNS = {
+    "telemetry": (
+        Telemetry,
+        [
+            ("device_code", "device__device_code"),
+            ("voltage", "voltage"),
+            ("current", "current"),
+            ("power_factor", "power_factor"),
+            ("timestamp", "timestamp"),
+        ],
+    ),
+    "parking_log": (
+        ParkingLog,
+        [
+            ("device_code", "device__device_code"),
+            ("is_occupied", "is_occupied"),
+            ("timestamp", "timestamp"),
+        ],
+    ),
+}
+
+
+def export_queryset(kind, device_code=None, zone_code=None, facility_id=None, start=None, end=None):
+    model, _ = EXPORT_COLUMNS[kind]
+    qs = model.objects.all()
+    if device_code:
+        qs = qs.filter(device__device_code=device_code)
+    if zone_code:
+        qs = qs.filter(device__parking_zone__code=zone_code)
+    if facility_id:
+        qs = qs.filter(device__parking_zone__parking_facility_id=facility_id)
+    if start:
+        qs = qs.filter(timestamp__gte=start)
+    if end:
+        qs = qs.filter(timestamp__lt=end)
+    return qs
+
+
+def export_rows(kind, device_code=None, zone_code=None, facility_id=None, start=None, end=None):
+    """
+    Export rows from the main table merged, in timestamp order, with the
+    detached monthly partitions and the archived days that overlap
+    [start, end); other months' files and days are never opened.
+    """
+    qs = export_queryset(kind, device_code, zone_code, facility_id, start, end)
+    partitions = partitions_for(kind, start, end)
+    days = archived_days(kind, start, end)
+    if not partitions and not days:
+        return iter_export_rows(kind, qs)
+    # a detached month's or an archived day's rows left in the main table,
+    # and an archived day's rows left in a partition, are being deleted
+    archived = [day_bounds(day) for day in days]
+    hot_rows = iter_export_rows(
+        kind, exclude_ranges(qs, [month_bounds(p.month) for p in partitions] + archived)
+    )
+
+    devices = Device.objects.all()
+    if device_code:
+        devices = devices.filter(device_code=device_code)
+    if zone_code:
+        devices = devices.filter(parking_zone__code=zone_code)
+    if facility_id:
+        devices = devices.filter(parking_zone__parking_facility_id=facility_id)
+    codes = dict(devices.values_list("id", "device_code"))
+    device_ids = list(codes) if device_code or zone_code or facility_id else None
+
+    _, columns = EXPORT_COLUMNS[kind]
+    # partitions and the archive hold plain columns, the device code comes from Device
+    lookups = ["device_id" if lookup == "device__device_code" else lookup for _, lookup in columns]
+    code_index = lookups.index("device_id")
+
+    def with_codes(rows):
+        for row in rows:
+            yield row[:code_index] + (codes.get(row[code_index]),) + row[code_index + 1 :]
+
+    return merge_by_timestamp(
+        lookups.index("timestamp"),
+        with_codes(iter_archive_rows(kind, lookups, device_ids, start, end)),
+        with_codes(
+            iter_partition_rows(kind, partitions, lookups, device_ids, start, end, archived)
+        ),
+        hot_rows,
+    )
+
+
+def iter_export_rows(kind, qs):
+    """Plain tuples in timestamp order, fetched EXPORT_CHUNK_SIZE rows at a time."""
+    _, columns = EXPORT_COLUMNS[kind]
+    return (
+        qs.order_by("timestamp", "id")
+        .values_list(*[lookup for _, lookup in columns])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    """csv.writer target that hands back each line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= EXPORT_LINES_PER_WRITE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def stream_csv(kind, rows):
+    _, columns = EXPORT_COLUMNS[kind]
+    writer = csv.writer(_Echo())
+    # same ISO 8601 form as the JSON endpoints: full microseconds, "Z" for UTC
+    encode = JSONEncoder().default
+
+    def lines():
+        yield writer.writerow([name for name, _ in columns])
+        for row in rows:
+            yield writer.writerow(
+                [encode(v) if isinstance(v, datetime) else v for v in row]
+            )
+
+    return _batched(lines())
+
+
+def stream_ndjson(kind, rows):
+    _, columns = EXPORT_COLUMNS[kind]
+    names = [name for name, _ in columns]
+    return _batched(
+        json.dumps(dict(zip(names, row)), cls=JSONEncoder) + "\n"
+        for row in rows
+    )
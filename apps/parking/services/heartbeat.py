@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.db.models import Case, F, Q, Value, When
+
+from ..models import OFFLINE_AFTER, Device
+from .response_cache import DEVICES_TOPIC, bump_devices
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = "parking:heartbeats"
+# each flush renames the buffer to its own key under this prefix, and
+# registers the key in HEARTBEAT_FLUSHES_KEY (score = drain time)
+HEARTBEAT_FLUSHING_KEY = "parking:heartbeats:flushing"
+HEARTBEAT_FLUSHES_KEY = "parking:heartbeats:flushes"
+# seconds after which an unacknowledged flush is presumed dead and its
+# heartbeats go back into the buffer; replaying one is harmless
+FLUSH_STALE_AFTER = 60
+# devices per UPDATE ... CASE statement
+FLUSH_BATCH_SIZE = 500
+
+# KEYS: buffer, this flush's key, registry. ARGV: now, stale before.
+# Puts stale flushes back, then moves the buffer to this flush's key and
+# returns its content, in one atomic step.
+_DRAIN_SCRIPT = """
+for _, token in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[2])) do
+    redis.call('ZUNIONSTORE', KEYS[1], 2, KEYS[1], token, 'AGGREGATE', 'MAX')
+    redis.call('DEL', token)
+    redis.call('ZREM', KEYS[3], token)
+end
+local rows = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+if #rows > 0 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    redis.call('ZADD', KEYS[3], ARGV[1], KEYS[2])
+end
+return rows
+"""
+
+# KEYS: buffer, the flush's key, registry
+_REQUEUE_SCRIPT = """
+redis.call('ZUNIONSTORE', KEYS[1], 2, KEYS[1], KEYS[2], 'AGGREGATE', 'MAX')
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[3], KEYS[2])
+"""
+
+
+def _to_score(dt):
+    # integer microseconds keep full precision in a Redis double score
+    return int(dt.timestamp() * 1_000_000)
+
+
+def _from_score(score):
+    return datetime.fromtimestamp(int(score) / 1_000_000, tz=dt_timezone.utc)
+
+
+class MemoryHeartbeatBuffer:
+    """
+    Per-process buffer. The celery worker cannot see it, so it flushes itself
+    on the next heartbeat once the flush interval has passed; meant for
+    development and single-process deployments.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def add(self, device_ids, seen_at):
+        with self._lock:
+            for device_id in device_ids:
+                current = self._pending.get(device_id)
+                if current is None or seen_at > current:
+                    self._pending[device_id] = seen_at
+
+            interval = getattr(settings, "HEARTBEAT_FLUSH_INTERVAL", 5)
+            due = time.monotonic() - self._last_flush >= interval
+
+        if due:
+            flush_heartbeats(self)
+
+    def drain(self):
+        """Take the pending heartbeats: returns (token, {device_id: seen_at})."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return pending, pending
+
+    def ack(self, token):
+        pass
+
+    def requeue(self, token):
+        with self._lock:
+            for device_id, seen_at in token.items():
+                current = self._pending.get(device_id)
+                if current is None or seen_at > current:
+                    self._pending[device_id] = seen_at
+
+
+class RedisHeartbeatBuffer:
+    """
+    Shared buffer in a Redis sorted set: member = device id, score = last seen
+    (ZADD GT keeps the maximum). A drain renames the set to a key of its own
+    and reads it in one script, so overlapping flushes each get a disjoint
+    snapshot; the key is deleted once the UPDATE went through, and put back
+    into the buffer if it failed or its flush never acknowledged it.
+    """
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+        self._drain = self.client.register_script(_DRAIN_SCRIPT)
+        self._requeue = self.client.register_script(_REQUEUE_SCRIPT)
+
+    def add(self, device_ids, seen_at):
+        score = _to_score(seen_at)
+        self.client.zadd(HEARTBEAT_KEY, {str(i): score for i in device_ids}, gt=True)
+
+    def drain(self):
+        """Take the pending heartbeats: returns (token, {device_id: seen_at})."""
+        token = f"{HEARTBEAT_FLUSHING_KEY}:{uuid.uuid4().hex}"
+        now = time.time()
+        rows = self._drain(
+            keys=[HEARTBEAT_KEY, token, HEARTBEAT_FLUSHES_KEY],
+            args=[now, now - FLUSH_STALE_AFTER],
+        )
+        # WITHSCORES inside a script comes back flat: member, score, ...
+        return token, {
+            int(member): _from_score(score) for member, score in zip(rows[::2], rows[1::2])
+        }
+
+    def ack(self, token):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(token)
+        pipe.zrem(HEARTBEAT_FLUSHES_KEY, token)
+        pipe.execute()
+
+    def requeue(self, token):
+        self._requeue(keys=[HEARTBEAT_KEY, token, HEARTBEAT_FLUSHES_KEY])
+
+
+_buffers = {}
+
+
+def get_heartbeat_buffer():
+    backend = getattr(settings, "HEARTBEAT_BUFFER_BACKEND", "memory")
+    url = getattr(settings, "HEARTBEAT_BUFFER_REDIS_URL", None)
+    key = (backend, url)
+    if key not in _buffers:
+        if backend == "redis":
+            _buffers[key] = RedisHeartbeatBuffer(url)
+        else:
+            _buffers[key] = MemoryHeartbeatBuffer()
+    return _buffers[key]
+
+
+def write_last_seen(last_seen_by_device):
+    """
+    Write {device_id: seen_at} with one UPDATE ... CASE per batch, never moving
+    last_seen backwards. The offline deadline moves forward with it.
+    """
+    items = sorted(last_seen_by_device.items())
+    updated = 0
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start : start + FLUSH_BATCH_SIZE]
+        newer = [
+            (
+                Q(id=device_id)
+                & (Q(last_seen__isnull=True) | Q(last_seen__lt=seen_at)),
+                seen_at,
+            )
+            for device_id, seen_at in batch
+        ]
+        updated += Device.objects.filter(id__in=[i for i, _ in batch]).update(
+            last_seen=Case(
+                *[When(q, then=Value(seen_at)) for q, seen_at in newer],
+                default=F("last_seen"),
+            ),
+            offline_deadline=Case(
+                *[
+                    When(q, then=Value(seen_at + OFFLINE_AFTER))
+                    for q, seen_at in newer
+                ],
+                default=F("offline_deadline"),
+            ),
+        )
+    return updated
+
+
+def record_heartbeats(device_ids, seen_at):
+    """
+    Buffer last_seen for the given devices instead of updating Device on every
+    ingest. Falls back to a direct UPDATE if Redis is unreachable.
+    """
+    device_ids = list(device_ids)
+    if not device_ids:
+        return
+    try:
+        get_heartbeat_buffer().add(device_ids, seen_at)
+    except redis.RedisError:
+        write_last_seen({device_id: seen_at for device_id in device_ids})
+
+
+def flush_heartbeats(buffer=None):
+    """
+    Write the buffered heartbeats. An unreachable Redis is logged and the
+    flush skipped, so callers such as the offline check carry on; the
+    heartbeats stay buffered for the next flush.
+    """
+    buffer = buffer or get_heartbeat_buffer()
+    try:
+        token, pending = buffer.drain()
+    except redis.RedisError:
+        logger.warning("Heartbeat buffer unreachable, flush skipped", exc_info=True)
+        return 0
+    if not pending:
+        return 0
+
+    try:
+        updated = write_last_seen(pending)
+    except Exception:
+        try:
+            buffer.requeue(token)
+        except redis.RedisError:
+            # the stale flush is picked up by a later drain
+            logger.warning("Could not requeue failed heartbeat flush", exc_info=True)
+        raise
+
+    try:
+        buffer.ack(token)
+    except redis.RedisError:
+        # replayed by a later drain, which cannot move last_seen backwards
+        logger.warning("Could not acknowledge heartbeat flush", exc_info=True)
+    # last_seen feeds the device status view
+    bump_devices(pending, [DEVICES_TOPIC])
+    return updated
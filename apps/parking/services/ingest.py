@@ -0,0 +1,207 @@
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Device, Telemetry, ParkingLog, TimeSeriesPartition
+from .alerts import resolve_offline_alerts
+from .heartbeat import record_heartbeats
+from .current_state import apply_parking_logs, apply_telemetry
+from .partitions import TIMESERIES_MODELS
+from .retention import writable
+from .response_cache import ALERTS_TOPIC, PARKING_TOPIC, bump_zones, device_zones
+from .rollups import refresh_parking_hourly, refresh_telemetry_rollups
+from .upsert import insert_new_rows
+from .writer import run_write
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_SIZE = 1000
+# a single reading is a few hundred bytes; a longer line is rejected as a whole
+NDJSON_MAX_LINE_BYTES = 64 * 1024
+
+
+def resolve_device_codes(codes):
+    """
+    Resolve a batch of device codes with a single IN query.
+    Returns {device_code: Device}; unknown codes are simply missing.
+    """
+    codes = set(codes)
+    if not codes:
+        return {}
+    return Device.objects.select_related("parking_zone").in_bulk(
+        codes, field_name="device_code"
+    )
+
+
+def telemetry_written(rows):
+    """
+    Derived tables to maintain whenever telemetry rows are written. Returns
+    the response cache topics that changed (no cached endpoint reads
+    telemetry, only the alerts it may resolve).
+    """
+    apply_telemetry(rows)
+    refresh_telemetry_rollups(rows)
+    if resolve_offline_alerts({row.device_id for row in rows}):
+        return [ALERTS_TOPIC]
+    return []
+
+
+def parking_logs_written(logs):
+    """
+    Derived tables to maintain whenever parking log rows are written. Returns
+    the response cache topics that changed.
+    """
+    apply_parking_logs(logs)
+    refresh_parking_hourly(logs)
+    if resolve_offline_alerts({log.device_id for log in logs}):
+        return [PARKING_TOPIC, ALERTS_TOPIC]
+    return [PARKING_TOPIC]
+
+
+def _bulk_insert(kind, objs, on_written):
+    """
+    Insert one batch in a single transaction, skipping (device, timestamp)
+    conflicts and rows of pruned days or detached months
+    (retention.writable), and maintain the derived tables from the rows that
+    really landed. Then buffer a heartbeat for the reporting devices and
+    invalidate the cached dashboards reading what the new rows changed, in
+    their zones only. The write goes through the single writer, which may
+    commit it together with other batches.
+    """
+
+    model = TIMESERIES_MODELS[kind]
+
+    def write():
+        with transaction.atomic():
+            keep = writable(kind, [o.timestamp for o in objs])
+            rows = [o for o, ok in zip(objs, keep) if ok]
+            created = insert_new_rows(model, rows, ["device", "timestamp"])
+            topics = on_written(created) if created else []
+        return created, topics
+
+    created, topics = run_write(write)
+
+    if topics:
+        bump_zones(device_zones({o.device for o in created}), topics)
+
+    record_heartbeats({o.device_id for o in objs}, timezone.now())
+
+    return {
+        "inserted": len(created),
+        "received": len(objs),
+        "skipped": len(objs) - len(created),
+    }
+
+
+def ingest_telemetry(records):
+    objs = [
+        Telemetry(
+            device=rec["device"],
+            voltage=rec["voltage"],
+            current=rec["current"],
+            power_factor=rec["power_factor"],
+            timestamp=rec["timestamp"],
+        )
+        for rec in records
+    ]
+    return _bulk_insert(TimeSeriesPartition.TELEMETRY, objs, telemetry_written)
+
+
+def ingest_parking_logs(records):
+    objs = [
+        ParkingLog(
+            device=rec["device"],
+            is_occupied=rec["is_occupied"],
+            timestamp=rec["timestamp"],
+        )
+        for rec in records
+    ]
+    return _bulk_insert(TimeSeriesPartition.PARKING_LOG, objs, parking_logs_written)
+
+
+def iter_ndjson_chunks(stream, chunk_size=NDJSON_CHUNK_SIZE):
+    """
+    Read an NDJSON body line by line and yield (records, line_numbers, errors)
+    chunks of at most chunk_size records, so memory stays bounded by one chunk.
+    """
+    records, line_numbers, errors = [], [], []
+    line_no = 0
+
+    for raw in iter(lambda: stream.readline(NDJSON_MAX_LINE_BYTES), b""):
+        line_no += 1
+        if len(raw) >= NDJSON_MAX_LINE_BYTES and not raw.endswith(b"\n"):
+            # readline stopped at the limit: drop the rest of the line so it
+            # is reported once, and the following lines keep their numbers
+            rest = raw
+            while len(rest) >= NDJSON_MAX_LINE_BYTES and not rest.endswith(b"\n"):
+                rest = stream.readline(NDJSON_MAX_LINE_BYTES)
+            errors.append(
+                {
+                    "line": line_no,
+                    "errors": [f"Line longer than {NDJSON_MAX_LINE_BYTES} bytes."],
+                }
+            )
+        elif not raw.strip():
+            continue
+        else:
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                errors.append({"line": line_no, "errors": ["Invalid JSON object."]})
+            else:
+                records.append(record)
+                line_numbers.append(line_no)
+
+        if len(records) + len(errors) >= chunk_size:
+            yield records, line_numbers, errors
+            records, line_numbers, errors = [], [], []
+
+    if records or errors:
+        yield records, line_numbers, errors
+
+
+def ingest_ndjson(stream, serializer_class, chunk_size=NDJSON_CHUNK_SIZE):
+    """
+    Validate and insert an NDJSON stream chunk by chunk with the given bulk
+    serializer. A chunk with any invalid line is rejected as a whole, the same
+    way a JSON batch is; earlier and later chunks are unaffected.
+    """
+    chunks = []
+    totals = {"received": 0, "inserted": 0, "skipped": 0, "rejected": 0}
+
+    for index, (records, line_numbers, errors) in enumerate(
+        iter_ndjson_chunks(stream, chunk_size)
+    ):
+        received = len(records) + len(errors)
+        serializer = serializer_class(data={"records": records})
+
+        if not serializer.is_valid():
+            record_errors = serializer.errors.get("records", [])
+            if isinstance(record_errors, list):
+                for line, rec_errors in zip(line_numbers, record_errors):
+                    if rec_errors:
+                        errors.append({"line": line, "errors": rec_errors})
+            else:
+                errors.append({"line": None, "errors": record_errors})
+
+        if errors:
+            result = {"inserted": 0, "skipped": 0, "rejected": received}
+            chunk = {"chunk": index, "received": received, **result}
+            chunk["errors"] = sorted(errors, key=lambda e: e["line"] or 0)
+        else:
+            result = serializer.save()
+            result = {
+                "inserted": result["inserted"],
+                "skipped": result["skipped"],
+                "rejected": 0,
+            }
+            chunk = {"chunk": index, "received": received, **result}
+
+        chunks.append(chunk)
+        totals["received"] += received
+        for key, value in result.items():
+            totals[key] += value
+
+    return {**totals, "chunks": chunks}
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Alert, Device
+from .alerts import upsert_alerts
+from .heartbeat import flush_heartbeats
+from .response_cache import ALERTS_TOPIC, bump_devices
+
+
+def offline_message(device_code, last_seen):
+    return f"Device {device_code} is offline. last_seen={last_seen}"
+
+
+def check_offline_devices(now=None):
+    """
+    Create or touch ACTIVE DEVICE_OFFLINE alerts for the active devices whose
+    offline deadline (last_seen + OFFLINE_AFTER) has passed, then clear their
+    deadlines so they are not picked up again until the next heartbeat.
+
+    Reads only the expired devices through the deadline index; alerts are
+    created or touched by the batched upsert, so concurrent checks cannot
+    open duplicates.
+    """
+    # buffered heartbeats must land first or live devices look stale
+    flush_heartbeats()
+
+    now = now or timezone.now()
+    expired = Device.objects.filter(is_active=True, offline_deadline__lte=now)
+    devices = {
+        device_id: (device_code, last_seen)
+        for device_id, device_code, last_seen in expired.values_list(
+            "id", "device_code", "last_seen"
+        )
+    }
+    if not devices:
+        return {"created": 0, "touched": 0}
+
+    with transaction.atomic():
+        alerts = upsert_alerts(
+            [
+                (
+                    device_id,
+                    Alert.DEVICE_OFFLINE,
+                    Alert.CRITICAL,
+                    offline_message(device_code, last_seen),
+                )
+                for device_id, (device_code, last_seen) in devices.items()
+            ],
+            now,
+        )
+        # a heartbeat flushed meanwhile has already moved the deadline on
+        Device.objects.filter(id__in=list(devices), offline_deadline__lte=now).update(
+            offline_deadline=None
+        )
+
+    bump_devices(devices, [ALERTS_TOPIC])
+    created = sum(alert.created for alert in alerts)
+    return {"created": created, "touched": len(alerts) - created}
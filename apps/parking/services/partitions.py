@@ -0,0 +1,324 @@
+import heapq
+import os
+import sqlite3
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, DateTimeField, Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import ParkingLog, Telemetry, TimeSeriesPartition
+from .rollups import fold_raw_rows
+
+TIMESERIES_MODELS = {
+    TimeSeriesPartition.TELEMETRY: Telemetry,
+    TimeSeriesPartition.PARKING_LOG: ParkingLog,
+}
+
+# pk range deleted per transaction
+DELETE_BATCH_SIZE = 5000
+# rows per executemany into a partition file
+COPY_CHUNK_SIZE = 5000
+
+
+def month_of(dt):
+    dt = timezone.localtime(dt)
+    return date(dt.year, dt.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def previous_month(month):
+    return date(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """[start, end) of a month in the current time zone."""
+    end_month = next_month(month)
+    return (
+        timezone.make_aware(datetime(month.year, month.month, 1)),
+        timezone.make_aware(datetime(end_month.year, end_month.month, 1)),
+    )
+
+
+def partition_path(kind, month):
+    directory = getattr(
+        settings, "TIMESERIES_PARTITION_DIR", os.path.join(settings.BASE_DIR, "partitions")
+    )
+    return os.path.join(str(directory), f"{kind}_{month:%Y_%m}.sqlite3")
+
+
+def delete_in_pk_batches(queryset, batch_size=DELETE_BATCH_SIZE):
+    """
+    Delete the rows of a queryset walking the primary key in ranges of
+    batch_size, one short transaction per range so writers only ever wait
+    for a single batch.
+    """
+    bounds = queryset.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return 0
+
+    deleted = 0
+    for start in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+        with transaction.atomic():
+            count, _ = queryset.filter(id__gte=start, id__lt=start + batch_size).delete()
+        deleted += count
+    return deleted
+
+
+def _columns(model):
+    return [field.column for field in model._meta.concrete_fields]
+
+
+def _create_table(conn, model):
+    table = model._meta.db_table
+    columns = [
+        "id INTEGER PRIMARY KEY" if column == "id" else column
+        for column in _columns(model)
+    ]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp)")
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {table}_device_timestamp "
+        f"ON {table} (device_id, timestamp)"
+    )
+
+
+def _copy_rows(conn, insert, queryset):
+    """Copy a queryset's rows into a partition file; returns the highest id copied."""
+    adapt = connection.ops.adapt_datetimefield_value
+    fields = queryset.model._meta.concrete_fields
+    last_id = None
+    chunk = []
+    for row in queryset.order_by("id").values_list(
+        *[field.attname for field in fields]
+    ).iterator(chunk_size=COPY_CHUNK_SIZE):
+        chunk.append([adapt(v) if isinstance(v, datetime) else v for v in row])
+        last_id = row[0]
+        if len(chunk) >= COPY_CHUNK_SIZE:
+            conn.executemany(insert, chunk)
+            chunk = []
+    if chunk:
+        conn.executemany(insert, chunk)
+    return last_id
+
+
+def detach_month(kind, month, batch_size=DELETE_BATCH_SIZE):
+    """
+    Move one closed month of raw rows from the main table into its own SQLite
+    file and record it in the TimeSeriesPartition catalog.
+
+    The month's aggregates are rebuilt first, as the raw rows are about to
+    leave the table they are computed from (a month already in the catalog
+    was folded with all its rows and is not folded again). The bulk of the
+    rows is copied without holding a transaction. One short transaction then
+    copies the rows written since and records the month in the catalog: from
+    its commit on, ingest refuses rows of the month (retention.writable), so
+    none can land behind the copy, and readers take the month from its file
+    and skip its rows left in the main table (exclude_ranges). Those are
+    deleted afterwards one pk batch per transaction, so ingest only ever
+    waits for a single batch.
+    """
+    model = TIMESERIES_MODELS[kind]
+    start, end = month_bounds(month)
+    rows = model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if not TimeSeriesPartition.objects.filter(kind=kind, month=month).exists():
+        fold_raw_rows(rows)
+
+    path = partition_path(kind, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = model._meta.db_table
+    insert = (
+        f"INSERT OR IGNORE INTO {table} ({', '.join(_columns(model))}) "
+        f"VALUES ({', '.join(['?'] * len(model._meta.concrete_fields))})"
+    )
+
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            _create_table(conn, model)
+            last_id = _copy_rows(conn, insert, rows)
+
+        with transaction.atomic():
+            with conn:
+                caught_up = _copy_rows(
+                    conn, insert, rows.filter(id__gt=last_id) if last_id else rows
+                )
+            last_id = caught_up or last_id
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            TimeSeriesPartition.objects.update_or_create(
+                kind=kind, month=month, defaults={"path": path, "rows": total}
+            )
+    finally:
+        conn.close()
+    if last_id is None:
+        return 0
+    return delete_in_pk_batches(rows.filter(id__lte=last_id), batch_size)
+
+
+def detached_until(kind):
+    """End of the newest month detached from kind's main table, None if none."""
+    month = (
+        TimeSeriesPartition.objects.filter(kind=kind)
+        .order_by("-month")
+        .values_list("month", flat=True)
+        .first()
+    )
+    return month_bounds(month)[1] if month else None
+
+
+def detach_closed_months(kind, hot_months=None, now=None):
+    """
+    Detach every month older than the hot window (the current month plus
+    TIMESERIES_HOT_MONTHS before it) that still has rows in the main table.
+    Returns {month: rows moved}.
+    """
+    model = TIMESERIES_MODELS[kind]
+    if hot_months is None:
+        hot_months = getattr(settings, "TIMESERIES_HOT_MONTHS", 1)
+
+    first_hot = month_of(now or timezone.now())
+    for _ in range(hot_months):
+        first_hot = previous_month(first_hot)
+    cutoff, _ = month_bounds(first_hot)
+
+    oldest = model.objects.filter(timestamp__lt=cutoff).aggregate(t=Min("timestamp"))["t"]
+    moved = {}
+    month = month_of(oldest) if oldest else first_hot
+    while month < first_hot:
+        moved[month] = detach_month(kind, month)
+        month = next_month(month)
+    return moved
+
+
+def drop_partition(partition):
+    """Drop a detached month: one file removal, however many rows it holds."""
+    if os.path.exists(partition.path):
+        os.remove(partition.path)
+    partition.delete()
+
+
+def drop_partitions_before(kind, cutoff):
+    """Drop the detached months that end at or before the cutoff."""
+    dropped = 0
+    for partition in TimeSeriesPartition.objects.filter(kind=kind):
+        if month_bounds(partition.month)[1] <= cutoff:
+            drop_partition(partition)
+            dropped += 1
+    return dropped
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def exclude_ranges(queryset, ranges):
+    """
+    The queryset without the rows whose timestamp falls in one of the
+    [start, end) ranges (detached months and archived days whose rows are
+    still being deleted from the main table). Adjacent ranges are merged.
+    """
+    for start, end in _merge_ranges(ranges):
+        queryset = queryset.exclude(timestamp__gte=start, timestamp__lt=end)
+    return queryset
+
+
+def partitions_for(kind, start=None, end=None):
+    """Detached months overlapping [start, end), oldest first."""
+    partitions = TimeSeriesPartition.objects.filter(kind=kind).order_by("month")
+    if start:
+        partitions = partitions.filter(month__gte=month_of(start))
+    if end:
+        partitions = partitions.filter(month__lte=month_of(end))
+    return list(partitions)
+
+
+def iter_partition_rows(
+    kind, partitions, columns, device_ids=None, start=None, end=None, exclude=()
+):
+    """
+    Tuples of the given model columns from detached months, in (timestamp,
+    id) order, leaving out the [start, end) ranges in exclude (archived days
+    still being deleted from the file). Each file is opened read-only on its
+    own connection only when the iteration reaches it.
+    """
+    model = TIMESERIES_MODELS[kind]
+    fields = {field.column: field for field in model._meta.concrete_fields}
+    # sqlite3 hands back the stored text and integers
+    converters = {}
+    for i, column in enumerate(columns):
+        if isinstance(fields[column], DateTimeField):
+            converters[i] = _parse_stored_datetime
+        elif isinstance(fields[column], BooleanField):
+            converters[i] = bool
+    adapt = connection.ops.adapt_datetimefield_value
+
+    where, params = [], []
+    if start:
+        where.append("timestamp >= ?")
+        params.append(adapt(start))
+    if end:
+        where.append("timestamp < ?")
+        params.append(adapt(end))
+    if device_ids is not None:
+        where.append(f"device_id IN ({', '.join(['?'] * len(device_ids))})")
+        params += list(device_ids)
+    for lo, hi in _merge_ranges(exclude):
+        where.append("NOT (timestamp >= ? AND timestamp < ?)")
+        params += [adapt(lo), adapt(hi)]
+    sql = f"SELECT {', '.join(columns)} FROM {model._meta.db_table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY timestamp, id"
+
+    for partition in partitions:
+        conn = sqlite3.connect(f"file:{partition.path}?mode=ro", uri=True)
+        try:
+            for row in conn.execute(sql, params):
+                if converters:
+                    row = tuple(
+                        converters[i](v) if i in converters else v
+                        for i, v in enumerate(row)
+                    )
+                yield row
+        finally:
+            conn.close()
+
+
+def delete_partition_range(kind, partition, start, end):
+    """Delete [start, end) from a detached month's file and update its row count."""
+    table = TIMESERIES_MODELS[kind]._meta.db_table
+    adapt = connection.ops.adapt_datetimefield_value
+    conn = sqlite3.connect(partition.path)
+    try:
+        with conn:
+            conn.execute(
+                f"DELETE FROM {table} WHERE timestamp >= ? AND timestamp < ?",
+                [adapt(start), adapt(end)],
+            )
+        partition.rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+    partition.save(update_fields=["rows", "updated_at"])
+
+
+def _parse_stored_datetime(value):
+    # Django stores naive UTC text on SQLite
+    if value is None:
+        return None
+    return parse_datetime(value).replace(tzinfo=dt_timezone.utc)
+
+
+def merge_by_timestamp(timestamp_index, *sources):
+    """Merge row sources (archive, detached months, main table) each sorted by timestamp."""
+    return heapq.merge(*sources, key=lambda row: row[timestamp_index])
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+
+from ..models import Device
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = "parking:version"
+RESPONSE_KEY_PREFIX = "parking:response"
+# global scope, used by requests without facility/zone filters
+ALL_SCOPE = "all"
+
+# what a scope's data changed in; each cached endpoint depends on some of
+# them, so a write only invalidates the endpoints that read what it wrote
+# parking logs and the state/rollups built from them, targets, zones, devices
+PARKING_TOPIC = "parking"
+DEVICES_TOPIC = "devices"  # Device.last_seen, devices and zones
+ALERTS_TOPIC = "alerts"
+
+
+def request_scopes(facility_id=None, zone_code=None):
+    """Version scopes a filtered response depends on."""
+    scopes = []
+    if facility_id:
+        scopes.append(f"facility:{facility_id}")
+    if zone_code:
+        scopes.append(f"zone:{zone_code}")
+    return scopes or [ALL_SCOPE]
+
+
+def _version_key(scope):
+    return f"{VERSION_KEY_PREFIX}:{scope}"
+
+
+def _modified_key(scope):
+    return f"{VERSION_KEY_PREFIX}:{scope}:modified"
+
+
+def topic_scopes(scopes, topics):
+    """One version counter per topic and scope, e.g. "parking:zone:A1"."""
+    return [f"{topic}:{scope}" for topic in topics for scope in scopes]
+
+
+def scope_state(scopes):
+    """
+    Current version of every scope and the latest time any of them changed
+    (unix seconds, or None if never bumped), in one cache round-trip.
+    """
+    version_keys = [_version_key(scope) for scope in scopes]
+    modified_keys = [_modified_key(scope) for scope in scopes]
+    found = cache.get_many(version_keys + modified_keys)
+
+    versions = [found.get(key, 0) for key in version_keys]
+    modified = [found[key] for key in modified_keys if key in found]
+    return versions, max(modified, default=None)
+
+
+def _bump(scope):
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # start from the clock, not 1, so an evicted counter never comes back
+        # to a value that old cache entries were keyed with
+        if not cache.add(key, time.time_ns(), timeout=None):
+            cache.incr(key)
+    cache.set(_modified_key(scope), int(time.time()), timeout=None)
+
+
+def bump_zones(zones, topics):
+    """
+    Invalidate cached responses that read the given topics for the given
+    (zone_code, facility_id) pairs, their facilities and the unfiltered
+    scope. The cache being down only costs the invalidation: it is logged,
+    never raised into the write that triggered it.
+    """
+    scopes = set()
+    for zone_code, facility_id in zones:
+        scopes.update([ALL_SCOPE, f"zone:{zone_code}", f"facility:{facility_id}"])
+    try:
+        for scope in topic_scopes(sorted(scopes), topics):
+            _bump(scope)
+    except Exception:
+        logger.warning("Could not bump response cache versions", exc_info=True)
+
+
+def bump_devices(device_ids, topics):
+    zones = (
+        Device.objects.filter(id__in=list(device_ids))
+        .values_list("parking_zone__code", "parking_zone__parking_facility_id")
+        .distinct()
+    )
+    bump_zones(zones, topics)
+
+
+def device_zones(devices):
+    """(zone_code, facility_id) pairs of Device objects with parking_zone loaded."""
+    return {(d.parking_zone.code, d.parking_zone.parking_facility_id) for d in devices}
+
+
+def response_digest(endpoint, params, scopes, versions, bucket_seconds=None):
+    """
+    Identity of one response: endpoint, normalized query params, the version
+    of every scope it depends on and, for time dependent responses, the
+    current time bucket. Used both as cache key and as ETag.
+    """
+    parts = [endpoint]
+    parts += [f"{name}={value}" for name, value in sorted(params.items()) if value]
+    parts += [f"{s}@{v}" for s, v in zip(scopes, versions)]
+    if bucket_seconds:
+        parts.append(f"t={int(time.time()) // bucket_seconds}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def response_key(endpoint, digest):
+    return f"{RESPONSE_KEY_PREFIX}:{endpoint}:{digest}"
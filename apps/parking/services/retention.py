@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ..models import RetentionCutoff, TimeSeriesPartition
+from .archive import is_archived
+from .partitions import (
+    TIMESERIES_MODELS,
+    delete_in_pk_batches,
+    drop_partitions_before,
+    month_of,
+)
+from .rollups import floor_time, fold_raw_rows
+
+# days of raw rows to keep when TIMESERIES_RETENTION does not say otherwise
+DEFAULT_RETENTION = {"telemetry": 90, "parking_log": 365}
+
+# pk range deleted per transaction
+PRUNE_BATCH_SIZE = 5000
+# freelist pages released per incremental_vacuum step
+VACUUM_PAGES_PER_STEP = 2000
+
+
+def retention_days(kind):
+    return getattr(settings, "TIMESERIES_RETENTION", {}).get(kind, DEFAULT_RETENTION[kind])
+
+
+def retention_cutoff(days, now=None):
+    """Start of the local day `days` ago, so no aggregate bucket straddles it."""
+    now = now or timezone.now()
+    return floor_time(now - timedelta(days=days), timedelta(days=1))
+
+
+def pruned_cutoff(kind):
+    """Latest cutoff prune_timeseries applied to kind, None if never pruned."""
+    return RetentionCutoff.objects.filter(kind=kind).values_list("cutoff", flat=True).first()
+
+
+def writable(kind, timestamps, now=None):
+    """
+    Which of these timestamps ingest may still write to kind's main table,
+    as a list of bools. Rows before the retention cutoff are refused: their
+    buckets were folded when the day was pruned, and a late row would
+    rebuild them from itself alone. A prune run with a shorter retention
+    (--days) moves that cutoff forward, so the latest applied one counts.
+    Rows of a month detached to a partition file (partitions.detach_month)
+    or of an archived day (archive.archive_day) are refused for the same
+    reason.
+    """
+    now = now or timezone.now()
+    cutoff = retention_cutoff(retention_days(kind), now)
+    # a prune never reaches into today: current rows cost no query
+    today = retention_cutoff(0, now)
+    if any(cutoff <= ts < today for ts in timestamps):
+        cutoff = max(cutoff, pruned_cutoff(kind) or cutoff)
+    months = [month_of(ts) for ts in timestamps]
+    # only closed months are detached: current rows cost no catalog query
+    closed = {month for ts, month in zip(timestamps, months) if ts >= cutoff} - {
+        month_of(now)
+    }
+    detached = set()
+    if closed:
+        detached = set(
+            TimeSeriesPartition.objects.filter(kind=kind, month__in=closed).values_list(
+                "month", flat=True
+            )
+        )
+    days = [timezone.localtime(ts).date() for ts in timestamps]
+    today = timezone.localtime(now).date()
+    # closed days only as well, one directory lookup per day
+    closed_days = {day for ts, day in zip(timestamps, days) if ts >= cutoff and day < today}
+    archived = {day for day in closed_days if is_archived(kind, day)}
+    return [
+        ts >= cutoff and month not in detached and day not in archived
+        for ts, month, day in zip(timestamps, months, days)
+    ]
+
+
+def reclaim_space(max_steps=None):
+    """
+    Hand freed pages back to the file system with PRAGMA incremental_vacuum,
+    a few thousand pages at a time. Only works when the database is in
+    auto_vacuum=INCREMENTAL mode (see enable_incremental_vacuum); returns the
+    number of pages released, or None when that mode is off.
+    """
+    if connection.vendor != "sqlite":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != 2:
+            return None
+
+        released = 0
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            cursor.execute("PRAGMA freelist_count")
+            free = cursor.fetchone()[0]
+            if not free:
+                break
+            cursor.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+            cursor.fetchall()
+            released += min(free, VACUUM_PAGES_PER_STEP)
+            steps += 1
+    return released
+
+
+def enable_incremental_vacuum():
+    """
+    Switch the SQLite database to auto_vacuum=INCREMENTAL. The mode only takes
+    effect after a full VACUUM, which rewrites the file once and locks it
+    while it runs.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
+
+
+def _record_cutoff(kind, cutoff):
+    """Keep the latest cutoff applied to kind; a later, longer retention never moves it back."""
+    mark, created = RetentionCutoff.objects.get_or_create(kind=kind, defaults={"cutoff": cutoff})
+    if not created and mark.cutoff < cutoff:
+        mark.cutoff = cutoff
+        mark.save(update_fields=["cutoff", "updated_at"])
+
+
+def prune_timeseries(kinds=None, days=None, batch_size=PRUNE_BATCH_SIZE, now=None):
+    """
+    Apply the retention policy: fold the expiring raw rows into the rollup
+    tables, delete them in primary key range batches, drop detached monthly
+    partitions past the cutoff, then release the freed pages.
+    Returns {kind: {"cutoff", "deleted", "dropped_partitions"}, "released_pages": n}.
+
+    Ingest skips raw rows arriving later for a pruned day (see writable()).
+    """
+    result = {}
+    for kind in kinds or TIMESERIES_MODELS:
+        cutoff = retention_cutoff(days if days is not None else retention_days(kind), now)
+        # the whole range is folded before anything is deleted: a bucket
+        # recomputed after part of its rows were gone would lose them
+        # recorded first: from here on ingest refuses rows of the expiring range
+        _record_cutoff(kind, cutoff)
+        expired = TIMESERIES_MODELS[kind].objects.filter(timestamp__lt=cutoff)
+        fold_raw_rows(expired)
+        result[kind] = {
+            "cutoff": cutoff.isoformat(),
+            "deleted": delete_in_pk_batches(expired, batch_size),
+            "dropped_partitions": drop_partitions_before(kind, cutoff),
+        }
+    result["released_pages"] = reclaim_space()
+    return result
@@ -0,0 +1,216 @@
+from datetime import timedelta
+
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from ..models import ParkingLog, ParkingLogHourly, Telemetry, TelemetryRollup
+
+# touched hours per recompute query, keeps the OR'ed range filter small
+HOURS_PER_QUERY = 48
+# (device, time span) ranges per telemetry recompute query
+SPANS_PER_QUERY = 48
+# touched buckets closer than this many buckets are recomputed as one span
+SPAN_MAX_GAP = 60
+# raw rows per refresh call when folding a whole range
+FOLD_CHUNK_SIZE = 20000
+
+TELEMETRY_METRICS = ("voltage", "current", "power_factor")
+
+# resolution, step, trunc; each level is rebuilt from the one before it
+TELEMETRY_RESOLUTIONS = [
+    (TelemetryRollup.MINUTE, timedelta(minutes=1), TruncMinute),
+    (TelemetryRollup.HOUR, timedelta(hours=1), TruncHour),
+    (TelemetryRollup.DAY, timedelta(days=1), TruncDay),
+]
+
+
+def floor_time(dt, step):
+    # same bucket TruncMinute/TruncHour/TruncDay give in the current time zone
+    dt = timezone.localtime(dt).replace(second=0, microsecond=0)
+    if step >= timedelta(hours=1):
+        dt = dt.replace(minute=0)
+    if step >= timedelta(days=1):
+        dt = dt.replace(hour=0)
+    return dt
+
+
+def floor_hour(dt):
+    return floor_time(dt, timedelta(hours=1))
+
+
+def _touched_hours(objs):
+    """{hour: {device_id, ...}} for every bucket the given rows fall into."""
+    touched = {}
+    for obj in objs:
+        touched.setdefault(floor_hour(obj.timestamp), set()).add(obj.device_id)
+    return touched
+
+
+def refresh_parking_hourly(logs):
+    """
+    Recompute the (device, hour) buckets touched by these logs from the raw
+    rows and upsert them. Recomputing instead of adding keeps duplicates,
+    late rows and replays exact.
+    """
+    touched = _touched_hours(logs)
+    hours = sorted(touched)
+
+    for start in range(0, len(hours), HOURS_PER_QUERY):
+        q = Q()
+        for hour in hours[start : start + HOURS_PER_QUERY]:
+            q |= Q(
+                device_id__in=touched[hour],
+                timestamp__gte=hour,
+                timestamp__lt=hour + timedelta(hours=1),
+            )
+
+        rows = (
+            ParkingLog.objects.filter(q)
+            .annotate(hour=TruncHour("timestamp"))
+            .values("device_id", "device__parking_zone_id", "hour")
+            .annotate(
+                total_events=Count("id"),
+                occupied_events=Count("id", filter=Q(is_occupied=True)),
+            )
+            .order_by()
+        )
+
+        ParkingLogHourly.objects.bulk_create(
+            [
+                ParkingLogHourly(
+                    device_id=row["device_id"],
+                    parking_zone_id=row["device__parking_zone_id"],
+                    hour=row["hour"],
+                    total_events=row["total_events"],
+                    occupied_events=row["occupied_events"],
+                )
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=["device", "hour"],
+            update_fields=[
+                "parking_zone",
+                "total_events",
+                "occupied_events",
+                "updated_at",
+            ],
+            batch_size=500,
+        )
+
+
+def _device_spans(points, step):
+    """
+    Turn (device_id, timestamp) points into per-device [start, end) spans of
+    whole buckets, merging buckets that are close together.
+    """
+    by_device = {}
+    for device_id, ts in points:
+        by_device.setdefault(device_id, set()).add(floor_time(ts, step))
+
+    spans = []
+    for device_id, buckets in by_device.items():
+        buckets = sorted(buckets)
+        lo = hi = buckets[0]
+        for bucket in buckets[1:]:
+            if bucket - hi > step * SPAN_MAX_GAP:
+                spans.append((device_id, lo, hi + step))
+                lo = bucket
+            hi = bucket
+        spans.append((device_id, lo, hi + step))
+    return spans
+
+
+def _telemetry_level_rows(resolution, trunc, q):
+    """Grouped rows for one rollup level, from raw rows or the level below."""
+    if resolution == TelemetryRollup.MINUTE:
+        qs = Telemetry.objects.filter(q).annotate(b=trunc("timestamp"))
+        aggregates = {"n": Count("id")}
+        for metric in TELEMETRY_METRICS:
+            aggregates[f"{metric}_lo"] = Min(metric)
+            aggregates[f"{metric}_hi"] = Max(metric)
+            aggregates[f"{metric}_total"] = Sum(metric)
+    else:
+        previous = {
+            TelemetryRollup.HOUR: TelemetryRollup.MINUTE,
+            TelemetryRollup.DAY: TelemetryRollup.HOUR,
+        }[resolution]
+        qs = TelemetryRollup.objects.filter(q, resolution=previous).annotate(
+            b=trunc("bucket")
+        )
+        aggregates = {"n": Sum("samples")}
+        for metric in TELEMETRY_METRICS:
+            aggregates[f"{metric}_lo"] = Min(f"{metric}_min")
+            aggregates[f"{metric}_hi"] = Max(f"{metric}_max")
+            aggregates[f"{metric}_total"] = Sum(f"{metric}_sum")
+
+    return qs.values("device_id", "b").annotate(**aggregates).order_by()
+
+
+def refresh_telemetry_rollups(rows):
+    """
+    Recompute the 1m buckets touched by these telemetry rows from raw data,
+    then the 1h buckets from 1m and the 1d buckets from 1h.
+    """
+    points = [(row.device_id, row.timestamp) for row in rows]
+    update_fields = ["samples", "updated_at"] + [
+        f"{metric}_{agg}" for metric in TELEMETRY_METRICS for agg in ("min", "max", "sum")
+    ]
+
+    for resolution, step, trunc in TELEMETRY_RESOLUTIONS:
+        spans = _device_spans(points, step)
+        # raw rows are filtered on timestamp, rollup levels on bucket
+        field = "timestamp" if resolution == TelemetryRollup.MINUTE else "bucket"
+
+        for start in range(0, len(spans), SPANS_PER_QUERY):
+            q = Q()
+            for device_id, lo, hi in spans[start : start + SPANS_PER_QUERY]:
+                q |= Q(device_id=device_id, **{f"{field}__gte": lo, f"{field}__lt": hi})
+
+            objs = []
+            for row in _telemetry_level_rows(resolution, trunc, q):
+                obj = TelemetryRollup(
+                    device_id=row["device_id"],
+                    resolution=resolution,
+                    bucket=row["b"],
+                    samples=row["n"],
+                )
+                for metric in TELEMETRY_METRICS:
+                    setattr(obj, f"{metric}_min", row[f"{metric}_lo"])
+                    setattr(obj, f"{metric}_max", row[f"{metric}_hi"])
+                    setattr(obj, f"{metric}_sum", row[f"{metric}_total"])
+                objs.append(obj)
+
+            TelemetryRollup.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["device", "resolution", "bucket"],
+                update_fields=update_fields,
+                batch_size=500,
+            )
+
+
+def fold_raw_rows(queryset):
+    """
+    Rebuild the aggregates of every bucket touched by a range of raw rows
+    (Telemetry or ParkingLog), e.g. before the rows are deleted or moved.
+    Rows are walked in time order so each chunk covers whole buckets except
+    at its edges, which the next chunk recomputes again.
+    """
+    refresh = {
+        Telemetry: refresh_telemetry_rollups,
+        ParkingLog: refresh_parking_hourly,
+    }[queryset.model]
+    rows = (
+        queryset.order_by("timestamp", "id")
+        .only("device", "timestamp")
+        .iterator(chunk_size=FOLD_CHUNK_SIZE)
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= FOLD_CHUNK_SIZE:
+            refresh(chunk)
+            chunk = []
+    if chunk:
+        refresh(chunk)
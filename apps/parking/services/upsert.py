@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from django.db import connection
+
+# rows per INSERT statement, lowered further if the backend's parameter limit
+# needs it
+INSERT_BATCH_SIZE = 500
+
+
+def _insert_sql(model, columns, unique_columns, rows, conflict_where=None):
+    quote = connection.ops.quote_name
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    target = ", ".join(quote(c) for c in unique_columns)
+    if conflict_where:
+        target += f") WHERE ({conflict_where}"
+    return (
+        f"INSERT INTO {quote(model._meta.db_table)} "
+        f"({', '.join(quote(c) for c in columns)}) "
+        f"VALUES {', '.join([row] * rows)} "
+        f"ON CONFLICT ({target}) DO NOTHING "
+        f"RETURNING {', '.join(quote(c) for c in [model._meta.pk.column, *unique_columns])}"
+    )
+
+
+def _key(values):
+    # the backend may parse returned datetimes (SQLite: naive UTC) while the
+    # parameters were sent adapted; compare both in their adapted form
+    adapt = connection.ops.adapt_datetimefield_value
+    return tuple(adapt(v) if isinstance(v, datetime) else v for v in values)
+
+
+def insert_new_rows(model, objs, unique_fields, conflict_where=None):
+    """
+    Insert unsaved instances with INSERT ... ON CONFLICT (unique_fields) DO
+    NOTHING RETURNING, one statement per batch. Rows skipped on a conflict
+    return nothing, so the result is exactly the instances that were
+    inserted (with their pk set, in input order), without a pre-check query.
+    Within the input, the first instance of a key wins. conflict_where is
+    the SQL predicate of a partial unique index to use as the target; it
+    must match the index definition literally, it cannot be a parameter.
+    """
+    meta = model._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    unique = [meta.get_field(name) for name in unique_fields]
+    unique_columns = [f.column for f in unique]
+
+    inserted = []
+    batch_size = min(INSERT_BATCH_SIZE, connection.ops.bulk_batch_size(fields, objs) or 1)
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start : start + batch_size]
+            params, by_key = [], {}
+            for obj in batch:
+                row = [
+                    f.get_db_prep_save(f.pre_save(obj, add=True), connection)
+                    for f in fields
+                ]
+                params += row
+                key = _key(row[fields.index(f)] for f in unique)
+                by_key.setdefault(key, obj)
+
+            cursor.execute(
+                _insert_sql(
+                    model,
+                    [f.column for f in fields],
+                    unique_columns,
+                    len(batch),
+                    conflict_where,
+                ),
+                params,
+            )
+            # RETURNING does not promise input order: match rows back by key
+            landed = set()
+            for pk, *key in cursor.fetchall():
+                obj = by_key[_key(key)]
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = connection.alias
+                landed.add(id(obj))
+            inserted += [obj for obj in batch if id(obj) in landed]
+    return inserted
@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, transaction
+
+# most writes committed together, and how long the writer waits for more
+# after the first one arrives
+GROUP_COMMIT_MAX_WRITES = 64
+GROUP_COMMIT_WAIT = 0.002
+# seconds a caller waits for its write when INGEST_WRITE_TIMEOUT is not set;
+# about the busy_timeout of an inline write plus the queue ahead of it
+WRITE_TIMEOUT = 30
+
+
+class SingleWriter:
+    """
+    One thread per process that runs every ingest write. Writes queued while
+    a commit is in progress are committed together in one transaction (group
+    commit), each in its own savepoint so a failing write only fails its own
+    caller. SQLite allows a single writer at a time anyway; funnelling the
+    process' writes through one connection turns lock contention between
+    request threads into a queue.
+    """
+
+    def __init__(self, max_writes=GROUP_COMMIT_MAX_WRITES, wait=GROUP_COMMIT_WAIT):
+        self.max_writes = max_writes
+        self.wait = wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def run(self, fn, timeout=WRITE_TIMEOUT):
+        """
+        Run fn() on the writer thread and return its result (or raise its
+        error). Raises OperationalError after timeout seconds; a write the
+        writer has not started by then is dropped, one already running may
+        still commit.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name="ingest-writer", daemon=True
+                )
+                self._thread.start()
+        future = Future()
+        self._queue.put((fn, future))
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise OperationalError(f"Ingest write not done after {timeout}s.") from None
+
+    def _loop(self):
+        while True:
+            writes = [self._queue.get()]
+            try:
+                deadline = time.monotonic() + self.wait
+                while len(writes) < self.max_writes:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        writes.append(
+                            self._queue.get(timeout=remaining)
+                            if remaining > 0
+                            else self._queue.get_nowait()
+                        )
+                    except queue.Empty:
+                        break
+                self._commit(writes)
+            except Exception as exc:
+                # whatever broke, no caller is left waiting on its future
+                for _, future in writes:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _commit(self, writes):
+        # callers that gave up (run() timed out) are skipped
+        writes = [
+            (fn, future) for fn, future in writes if future.set_running_or_notify_cancel()
+        ]
+        if not writes:
+            return
+        close_old_connections()
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for fn, future in writes:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, fn(), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # the commit itself failed: none of the writes landed
+            for _, future in writes:
+                future.set_exception(exc)
+            return
+
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+_writer = SingleWriter()
+
+
+def run_write(fn):
+    """
+    Run an ingest write through the process' single writer, or inline when
+    INGEST_SINGLE_WRITER is off or the caller is already inside a transaction
+    (the writer's connection could not see its uncommitted rows and would
+    wait on its lock). Waits at most INGEST_WRITE_TIMEOUT seconds.
+    """
+    if not getattr(settings, "INGEST_SINGLE_WRITER", False) or connection.in_atomic_block:
+        return fn()
+    return _writer.run(fn, getattr(settings, "INGEST_WRITE_TIMEOUT", WRITE_TIMEOUT))
@@ -1,32 +1,56 @@
 from celery import shared_task
-from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Q
 
-from .models import Device, Alert
-from .services.alerts import create_or_touch_alert
+from .services.heartbeat import flush_heartbeats as flush_heartbeat_buffer
+from .services.offline import check_offline_devices
+from .services.archive import archive_closed_days
+from .services.partitions import TIMESERIES_MODELS, detach_closed_months
+from .services.retention import prune_timeseries as prune_expired_rows
+from .serializer import TelemetryBulkSerializer, ParkingLogBulkSerializer
+
+INGEST_SERIALIZERS = {
+    "telemetry": TelemetryBulkSerializer,
+    "parking_log": ParkingLogBulkSerializer,
+}
+
+
+@shared_task
+def flush_heartbeats():
+    return {"updated": flush_heartbeat_buffer()}
 
 
 @shared_task
 def check_device_offline():
-    now = timezone.now()
-    cutoff = now - timedelta(minutes=2)
-
-    qs = Device.objects.filter(is_active=True).filter(
-        Q(last_seen__lt=cutoff) | Q(last_seen__isnull=True)
-    )
-
-    created_count = 0
-    touched_count = 0
-
-    for d in qs:
-        msg = f"Device {d.device_code} is offline. last_seen={d.last_seen}"
-        alert, created = create_or_touch_alert(
-            d, Alert.DEVICE_OFFLINE, Alert.CRITICAL, msg
-        )
-        if created:
-            created_count += 1
-        else:
-            touched_count += 1
-
-    return {"created": created_count, "touched": touched_count}
+    return check_offline_devices()
+
+
+@shared_task
+def prune_timeseries():
+    return prune_expired_rows()
+
+
+@shared_task
+def detach_timeseries_months():
+    return {
+        kind: {f"{month:%Y-%m}": moved for month, moved in detach_closed_months(kind).items()}
+        for kind in TIMESERIES_MODELS
+    }
+
+
+@shared_task
+def archive_timeseries_days():
+    return {
+        kind: {f"{day:%Y-%m-%d}": rows for day, rows in archive_closed_days(kind).items()}
+        for kind in TIMESERIES_MODELS
+    }
+
+
+@shared_task
+def ingest_bulk(kind, records):
+    """
+    Write-behind ingestion for ?async=true bulk posts: full validation and the
+    insert run here, the result is kept in the result backend for polling.
+    """
+    serializer = INGEST_SERIALIZERS[kind](data={"records": records})
+    if not serializer.is_valid():
+        return {"status": "rejected", "errors": serializer.errors}
+    return {"status": "done", **serializer.save()}
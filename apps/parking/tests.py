@@ -1,3 +1,1465 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from project.celery import app as celery_app
+
+from .models import (
+    ParkingFacility,
+    ParkingZone,
+    Device,
+    ParkingLog,
+    ParkingTarget,
+    Telemetry,
+    DeviceCurrentState,
+    Alert,
+    ParkingLogHourly,
+    TelemetryRollup,
+    TimeSeriesPartition,
+    RetentionCutoff,
+)
+from .serializer import (
+    AlertSerializer,
+    ParkingLogBulkSerializer,
+    ParkingLogSerializer,
+    TelemetryBulkSerializer,
+    TelemetrySerializer,
+)
+from .services import archive, heartbeat, writer
+from .services.alerts import upsert_alerts
+from .services.ingest import NDJSON_MAX_LINE_BYTES, iter_ndjson_chunks
+from .services.offline import check_offline_devices
+from .services.archive import archive_day
+from .services.partitions import delete_in_pk_batches, detach_month, month_of
+from .services.retention import prune_timeseries, retention_cutoff
+
+
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+class FleetMixin:
+    """One facility with zones Z0 and Z1 of three devices each."""
+
+    def post_logs(self, records):
+        response = self.client.post(
+            "/api/parking-log/bulk/", {"records": records}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def post_telemetry(self, records):
+        response = self.client.post(
+            "/api/telemetry/bulk/", {"records": records}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def setUp(self):
+        # a fresh in-memory heartbeat buffer per test
+        heartbeat._buffers.clear()
+        self.client = APIClient()
+        self.facility = ParkingFacility.objects.create(name="HQ")
+        self.zones = [
+            ParkingZone.objects.create(
+                parking_facility=self.facility, name=f"Zone {z}", code=f"Z{z}"
+            )
+            for z in range(2)
+        ]
+        self.devices = [
+            Device.objects.create(parking_zone=zone, device_code=f"{zone.code}-D{d}")
+            for zone in self.zones
+            for d in range(3)
+        ]
+
+
+def log(device_code, occupied, ts):
+    return {"device_code": device_code, "is_occupied": occupied, "timestamp": ts.isoformat()}
+
+
+def reading(device_code, ts, voltage=220.0, current=1.0, power_factor=0.9):
+    return {
+        "device_code": device_code,
+        "voltage": voltage,
+        "current": current,
+        "power_factor": power_factor,
+        "timestamp": ts.isoformat(),
+    }
+
+
+@override_settings(CACHES=NO_CACHE)
+class DashboardSummaryQueryBudgetTests(TestCase):
+    """The zone-wise dashboard must cost a fixed number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.facility = ParkingFacility.objects.create(name="HQ")
+
+    def _make_zones(self, count):
+        for z in range(count):
+            zone = ParkingZone.objects.create(
+                parking_facility=self.facility, name=f"Zone {z}", code=f"Z{z}"
+            )
+            ParkingTarget.objects.create(
+                parking_zone=zone, date="2026-02-15", target_parking_events=4
+            )
+            for d in range(2):
+                device = Device.objects.create(
+                    parking_zone=zone, device_code=f"Z{z}-D{d}"
+                )
+                for minute, occupied in ((0, False), (5, True)):
+                    ParkingLog.objects.create(
+                        device=device,
+                        is_occupied=occupied,
+                        timestamp=datetime(
+                            2026, 2, 15, 10, minute, tzinfo=dt_timezone.utc
+                        ),
+                    )
+                DeviceCurrentState.objects.create(
+                    device=device,
+                    is_occupied=True,
+                    occupancy_at=datetime(2026, 2, 15, 10, 5, tzinfo=dt_timezone.utc),
+                )
+
+    def _get_summary(self, params, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get("/api/dashboard/summary/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_zones(self):
+        self._make_zones(2)
+        self._get_summary({}, 4)
+        # a dated summary also looks up detached partitions covering the day
+        self._get_summary({"date": "2026-02-15"}, 6)
+
+        for z in range(2, 30):
+            ParkingZone.objects.create(
+                parking_facility=self.facility, name=f"Zone {z}", code=f"Z{z}"
+            )
+        data = self._get_summary({}, 4)
+        self.assertEqual(len(data["zone_wise_indicators"]), 30)
+        self._get_summary({"date": "2026-02-15", "facility": self.facility.id}, 6)
+
+    def test_zone_indicators_match_totals(self):
+        self._make_zones(3)
+        data = self._get_summary({"date": "2026-02-15"}, 6)
+
+        self.assertEqual(data["total_parking_events"], 12)
+        self.assertEqual(data["current_occupancy_count"], 6)
+        self.assertEqual(data["active_devices_count"], 6)
+        self.assertEqual(data["target_parking_events"], 12)
+        self.assertEqual(data["efficiency"], 100.0)
+        self.assertEqual(
+            data["zone_wise_indicators"]["Z1"],
+            {
+                "total_parking_events": 4,
+                "current_occupancy_count": 2,
+                "active_devices_count": 2,
+                "alerts_triggered_count": 0,
+                "target_parking_events": 4,
+                "efficiency": 100.0,
+            },
+        )
+
+
+class BulkValidationQueryTests(FleetMixin, TestCase):
+    """Validating a bulk batch costs one query however many records it has."""
+
+    def test_query_count_depends_on_devices_not_records(self):
+        base = local_day(1)
+        for count in (2, 300):
+            records = [
+                reading(f"Z0-D{i % 2}", base + timedelta(seconds=i)) for i in range(count)
+            ]
+            serializer = TelemetryBulkSerializer(data={"records": records})
+            with self.assertNumQueries(1):
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        records = [log("Z0-D0", True, base), log("NOPE", True, base)] * 50
+        serializer = ParkingLogBulkSerializer(data={"records": records})
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            serializer.errors["records"][1]["device_code"],
+            ["Object with device_code=NOPE does not exist."],
+        )
+
+
+class NdjsonChunkTests(SimpleTestCase):
+    def _chunks(self, body, chunk_size=1000):
+        return list(iter_ndjson_chunks(io.BytesIO(body), chunk_size))
+
+    def test_overlong_line_is_one_error_at_its_line(self):
+        long_line = b'{"voltage": "' + b"9" * (3 * NDJSON_MAX_LINE_BYTES) + b'"}'
+        body = b'{"a": 1}\n' + long_line + b'\n\n{"b": 2}\nnot json\n'
+
+        [(records, line_numbers, errors)] = self._chunks(body)
+
+        self.assertEqual(records, [{"a": 1}, {"b": 2}])
+        self.assertEqual(line_numbers, [1, 4])
+        self.assertEqual(
+            errors,
+            [
+                {"line": 2, "errors": [f"Line longer than {NDJSON_MAX_LINE_BYTES} bytes."]},
+                {"line": 5, "errors": ["Invalid JSON object."]},
+            ],
+        )
+
+    def test_overlong_last_line_without_newline(self):
+        body = b'{"a": 1}\n' + b"x" * NDJSON_MAX_LINE_BYTES
+
+        [(records, line_numbers, errors)] = self._chunks(body)
+
+        self.assertEqual(line_numbers, [1])
+        self.assertEqual([e["line"] for e in errors], [2])
+
+    def test_chunks_are_bounded(self):
+        body = b"".join(b'{"n": %d}\n' % n for n in range(5))
+
+        chunks = self._chunks(body, chunk_size=2)
+
+        self.assertEqual([c[1] for c in chunks], [[1, 2], [3, 4], [5]])
+
+
+@override_settings(
+    CACHES=NO_CACHE,
+    HEARTBEAT_BUFFER_BACKEND="redis",
+    # nothing listens there
+    HEARTBEAT_BUFFER_REDIS_URL="redis://127.0.0.1:1/0",
+)
+class HeartbeatBufferTests(FleetMixin, TestCase):
+    def test_unreachable_redis_does_not_stop_the_offline_check(self):
+        device = self.devices[0]
+        Device.objects.filter(pk=device.pk).update(
+            offline_deadline=timezone.now() - timedelta(seconds=1)
+        )
+
+        with self.assertLogs("apps.parking.services.heartbeat", "WARNING"):
+            result = check_offline_devices()
+
+        self.assertEqual(result, {"created": 1, "touched": 0})
+        self.assertTrue(
+            Alert.objects.filter(device=device, alert_type=Alert.DEVICE_OFFLINE).exists()
+        )
+
+    def test_unreachable_redis_writes_heartbeats_directly(self):
+        seen_at = timezone.now()
+
+        heartbeat.record_heartbeats([self.devices[0].pk], seen_at)
+
+        self.devices[0].refresh_from_db()
+        self.assertEqual(self.devices[0].last_seen, seen_at)
+
+    def test_memory_flush_failure_puts_heartbeats_back(self):
+        buffer = heartbeat.MemoryHeartbeatBuffer()
+        seen_at = timezone.now()
+        buffer._pending = {self.devices[0].pk: seen_at}
+
+        with mock.patch.object(heartbeat, "write_last_seen", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                heartbeat.flush_heartbeats(buffer)
+        self.assertEqual(heartbeat.flush_heartbeats(buffer), 1)
+
+        self.devices[0].refresh_from_db()
+        self.assertEqual(self.devices[0].last_seen, seen_at)
+        self.assertEqual(heartbeat.flush_heartbeats(buffer), 0)
+
+    def test_last_seen_never_moves_backwards(self):
+        now = timezone.now()
+        heartbeat.write_last_seen({self.devices[0].pk: now})
+        heartbeat.write_last_seen({self.devices[0].pk: now - timedelta(minutes=5)})
+
+        self.devices[0].refresh_from_db()
+        self.assertEqual(self.devices[0].last_seen, now)
+        self.assertEqual(self.devices[0].offline_deadline, now + timedelta(minutes=2))
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class CurrentStateTests(FleetMixin, TestCase):
+    def test_state_follows_the_newest_log_only(self):
+        now = timezone.now().replace(microsecond=0)
+        self.post_logs(
+            [
+                log("Z0-D0", False, now - timedelta(minutes=10)),
+                log("Z0-D0", True, now - timedelta(minutes=5)),
+                log("Z0-D1", True, now - timedelta(minutes=5)),
+            ]
+        )
+        # a late, older log must not move the state backwards
+        self.post_logs([log("Z0-D0", False, now - timedelta(minutes=7))])
+
+        state = DeviceCurrentState.objects.get(device__device_code="Z0-D0")
+        self.assertTrue(state.is_occupied)
+        self.assertEqual(state.occupancy_at, now - timedelta(minutes=5))
+
+        self.post_logs([log("Z0-D1", False, now - timedelta(minutes=1))])
+        data = self.client.get("/api/dashboard/summary/").json()
+        self.assertEqual(data["current_occupancy_count"], 1)
+        self.assertEqual(data["zone_wise_indicators"]["Z0"]["current_occupancy_count"], 1)
+
+    def test_telemetry_keeps_its_own_columns(self):
+        now = timezone.now().replace(microsecond=0)
+        self.post_logs([log("Z0-D0", True, now - timedelta(minutes=2))])
+        self.post_telemetry([reading("Z0-D0", now - timedelta(minutes=1), voltage=231.5)])
+
+        state = DeviceCurrentState.objects.get(device__device_code="Z0-D0")
+        self.assertTrue(state.is_occupied)
+        self.assertEqual(state.voltage, 231.5)
+        self.assertEqual(state.telemetry_at, now - timedelta(minutes=1))
+
+
+def local_day(days_ago, hour=10):
+    """A local timestamp on a day days_ago days back, at the given hour."""
+    day = timezone.localtime() - timedelta(days=days_ago)
+    return day.replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class HourlyRollupTests(FleetMixin, TestCase):
+    def test_rollup_matches_raw_rows_through_duplicates_and_late_rows(self):
+        base = local_day(2)
+        self.post_logs(
+            [
+                log("Z0-D0", True, base + timedelta(minutes=5)),
+                log("Z0-D1", False, base + timedelta(minutes=20)),
+                log("Z1-D0", True, base + timedelta(hours=1, minutes=1)),
+            ]
+        )
+        # a replay of the same batch plus a late row for the first hour
+        self.post_logs(
+            [
+                log("Z0-D0", True, base + timedelta(minutes=5)),
+                log("Z0-D0", True, base + timedelta(minutes=50)),
+            ]
+        )
+
+        data = self.client.get(
+            "/api/metrics/hourly-usage/", {"date": base.date().isoformat()}
+        ).json()
+        self.assertEqual(
+            [(row["total_events"], row["occupied_events"]) for row in data["hourly"]],
+            [(3, 2), (1, 1)],
+        )
+
+        zone = self.client.get(
+            "/api/metrics/hourly-usage/",
+            {"date": base.date().isoformat(), "zone_code": "Z1"},
+        ).json()
+        self.assertEqual(len(zone["hourly"]), 1)
+        self.assertEqual(zone["hourly"][0]["total_events"], 1)
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class TelemetrySeriesTests(FleetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.base = local_day(2)
+        self.post_telemetry(
+            [
+                reading("Z0-D0", self.base + timedelta(seconds=10), voltage=200.0),
+                reading("Z0-D0", self.base + timedelta(seconds=40), voltage=240.0),
+                reading("Z0-D0", self.base + timedelta(minutes=2), voltage=230.0),
+                reading("Z0-D0", self.base + timedelta(hours=1), voltage=210.0),
+                reading("Z0-D1", self.base + timedelta(seconds=30), voltage=100.0),
+            ]
+        )
+
+    def _series(self, resolution, hours=3):
+        response = self.client.get(
+            "/api/telemetry/series/",
+            {
+                "device_code": "Z0-D0",
+                "resolution": resolution,
+                "start": self.base.isoformat(),
+                "end": (self.base + timedelta(hours=hours)).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_levels_agree(self):
+        minutes = self._series("1m")["points"]
+        self.assertEqual([p["count"] for p in minutes], [2, 1, 1])
+        self.assertEqual(
+            minutes[0]["voltage"], {"min": 200.0, "max": 240.0, "avg": 220.0}
+        )
+
+        hours = self._series("1h")["points"]
+        self.assertEqual([p["count"] for p in hours], [3, 1])
+        self.assertEqual(hours[0]["voltage"]["avg"], 670.0 / 3)
+
+        [day] = self._series("1d")["points"]
+        self.assertEqual(day["count"], 4)
+        self.assertEqual(day["voltage"]["min"], 200.0)
+
+    def test_auto_resolution_and_validation(self):
+        self.assertEqual(self._series("auto")["resolution"], "1m")
+        self.assertEqual(self._series("auto", hours=24 * 30)["resolution"], "1h")
+
+        response = self.client.get(
+            "/api/telemetry/series/", {"device_code": "Z0-D0", "resolution": "5m"}
+        )
+        self.assertEqual(response.status_code, 400)
+        for params in ({"end": "garbage"}, {"start": "garbage"}):
+            response = self.client.get(
+                "/api/telemetry/series/", {"device_code": "Z0-D0", **params}
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/telemetry/series/", {"device_code": "NOPE"})
+        self.assertEqual(response.status_code, 404)
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class BrokenCache(BaseCache):
+    """A cache backend whose server is down."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+    def _fail(self, *args, **kwargs):
+        raise ConnectionError("cache down")
+
+    add = get = set = touch = delete = get_many = incr = clear = _fail
+
+
+@override_settings(CACHES=LOCMEM_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class ResponseCacheTests(FleetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.now = timezone.now().replace(microsecond=0)
+        self.post_logs([log("Z0-D0", True, self.now - timedelta(minutes=5))])
+
+    def _summary(self, cached, params=None):
+        if cached:
+            with self.assertNumQueries(0):
+                response = self.client.get("/api/dashboard/summary/", params or {})
+        else:
+            response = self.client.get("/api/dashboard/summary/", params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_only_writes_to_what_a_response_reads_invalidate_it(self):
+        self._summary(cached=False)
+        self._summary(cached=False, params={"zone_code": "Z1"})
+        self._summary(cached=True)
+
+        # telemetry is not on the summary; a replayed parking log changes nothing
+        self.post_telemetry([reading("Z0-D1", self.now - timedelta(minutes=1))])
+        self.post_logs([log("Z0-D0", True, self.now - timedelta(minutes=5))])
+        self._summary(cached=True)
+
+        # a new log in Z0 invalidates Z0's scopes but not Z1's
+        self.post_logs([log("Z0-D1", True, self.now - timedelta(minutes=1))])
+        data = self._summary(cached=False)
+        self.assertEqual(data["current_occupancy_count"], 2)
+        self._summary(cached=True, params={"zone_code": "Z1"})
+
+    def test_zone_device_and_target_creates_invalidate_the_summary(self):
+        day = {"date": self.now.date().isoformat()}
+        self._summary(cached=False, params=day)
+        self._summary(cached=True, params=day)
+
+        response = self.client.post(
+            "/api/parking-target/",
+            {"parking_zone": self.zones[0].pk, "date": day["date"], "target_parking_events": 4},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        data = self._summary(cached=False, params=day)
+        self.assertEqual((data["target_parking_events"], data["efficiency"]), (4, 25.0))
+
+        response = self.client.post(
+            "/api/devices/", {"parking_zone": self.zones[1].pk, "device_code": "Z1-D3", "is_active": True}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._summary(cached=False)["active_devices_count"], 7)
+
+        response = self.client.post(
+            "/api/zones/",
+            {"parking_facility": self.facility.pk, "name": "Zone 2", "code": "Z2"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("Z2", self._summary(cached=False)["zone_wise_indicators"])
+
+    def test_alert_changes_leave_the_summary_cached(self):
+        self._summary(cached=False)
+        alert = Alert.objects.create(
+            device=self.devices[0],
+            alert_type="DEVICE_OFFLINE",
+            severity="HIGH",
+            message="offline",
+            first_triggered_at=self.now,
+            last_triggered_at=self.now,
+        )
+        response = self.client.patch("/api/alerts/resolve/", {"ids": [alert.pk]}, format="json")
+        self.assertEqual(response.json(), {"updated": 1})
+        self._summary(cached=True)
+
+    def test_heartbeat_flush_invalidates_device_status_only(self):
+        self._summary(cached=False)
+        self.client.get("/api/devices/status/")
+
+        heartbeat.record_heartbeats([self.devices[3].pk], self.now)
+        heartbeat.flush_heartbeats()
+
+        self._summary(cached=True)
+        statuses = self.client.get("/api/devices/status/").json()["results"]
+        self.assertEqual(
+            {d["device_code"] for d in statuses if d["last_seen"]}, {"Z0-D0", "Z1-D0"}
+        )
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "apps.parking.tests.BrokenCache"}}
+    )
+    def test_cache_errors_are_logged_not_raised(self):
+        with self.assertLogs("apps.parking", "WARNING"):
+            before = self._summary(cached=False)
+            self.post_logs([log("Z0-D1", True, self.now - timedelta(minutes=1))])
+            after = self._summary(cached=False)
+        self.assertEqual(before["current_occupancy_count"], 1)
+        self.assertEqual(after["current_occupancy_count"], 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class ConditionalGetTests(FleetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.now = timezone.now().replace(microsecond=0)
+
+    def test_etag_revalidation(self):
+        first = self.client.get("/api/dashboard/summary/")
+        etag = first.headers["ETag"]
+        self.assertIn("no-cache", first.headers["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/dashboard/summary/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.post_logs([log("Z0-D0", True, self.now - timedelta(minutes=1))])
+        response = self.client.get("/api/dashboard/summary/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json()["current_occupancy_count"], 1)
+
+    def test_if_modified_since_alone_is_never_a_304(self):
+        self.post_logs([log("Z0-D0", True, self.now - timedelta(minutes=2))])
+        first = self.client.get("/api/dashboard/summary/")
+        last_modified = first.headers["Last-Modified"]
+
+        # a second change within the same second as the first one
+        self.post_logs([log("Z0-D1", True, self.now - timedelta(minutes=1))])
+        response = self.client.get(
+            "/api/dashboard/summary/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["current_occupancy_count"], 2)
+
+
+@override_settings(CACHES=NO_CACHE)
+class CursorPaginationTests(FleetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ts = local_day(1)
+        # 250 rows sharing one timestamp, one row before and one after
+        devices = [
+            Device.objects.create(parking_zone=self.zones[0], device_code=f"TIE-{i}")
+            for i in range(250)
+        ]
+        ParkingLog.objects.bulk_create(
+            [ParkingLog(device=d, is_occupied=True, timestamp=self.ts) for d in devices]
+            + [
+                ParkingLog(device=self.devices[0], is_occupied=False, timestamp=self.ts + delta)
+                for delta in (timedelta(minutes=-1), timedelta(minutes=1))
+            ]
+        )
+
+    def _walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            ids.append([row["id"] for row in page["results"]])
+            url = page[link]
+        return ids
+
+    def test_ties_page_without_gaps_or_repeats(self):
+        pages = self._walk("/api/parking-log/?page_size=100", "next")
+        self.assertEqual([len(p) for p in pages], [100, 100, 52])
+
+        expected = list(
+            ParkingLog.objects.order_by("timestamp", "id").values_list("id", flat=True)
+        )
+        self.assertEqual(sum(pages, []), expected)
+
+        last = self.client.get("/api/parking-log/?page_size=100")
+        for _ in range(2):
+            last = self.client.get(last.json()["next"])
+        back = self._walk(last.json()["previous"], "previous")
+        self.assertEqual(sum(reversed(back), []), expected[:200])
+
+    def test_invalid_cursor_is_404(self):
+        cursor = base64.b64encode(b"p=yesterday%7C12").decode()
+        response = self.client.get("/api/parking-log/", {"cursor": cursor})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class OfflineDetectionTests(FleetMixin, TestCase):
+    def _expire(self, devices, now):
+        Device.objects.filter(pk__in=[d.pk for d in devices]).update(
+            offline_deadline=now - timedelta(seconds=1)
+        )
+
+    def test_creates_and_touches_one_alert_per_device(self):
+        now = timezone.now()
+        self._expire(self.devices[:2], now)
+        old = Alert.objects.create(
+            device=self.devices[1],
+            alert_type=Alert.DEVICE_OFFLINE,
+            severity=Alert.CRITICAL,
+            message="earlier",
+            first_triggered_at=now - timedelta(hours=1),
+            last_triggered_at=now - timedelta(hours=1),
+        )
+
+        self.assertEqual(check_offline_devices(now), {"created": 1, "touched": 1})
+
+        self.assertEqual(
+            Alert.objects.filter(alert_type=Alert.DEVICE_OFFLINE, status=Alert.ACTIVE).count(),
+            2,
+        )
+        old.refresh_from_db()
+        self.assertEqual(old.last_triggered_at, now)
+        self.assertEqual(old.first_triggered_at, now - timedelta(hours=1))
+
+    def test_query_count_does_not_grow_with_expired_devices(self):
+        now = timezone.now()
+        self._expire(self.devices[:1], now)
+        with CaptureQueriesContext(connection) as few:
+            check_offline_devices(now)
+
+        more = [
+            Device.objects.create(parking_zone=self.zones[0], device_code=f"EXP-{i}")
+            for i in range(40)
+        ]
+        self._expire(more, now)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(check_offline_devices(now)["created"], 40)
+
+        self.assertEqual(len(few), len(many))
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class OfflineDeadlineTests(FleetMixin, TestCase):
+    def test_only_devices_past_their_deadline_are_reported_once(self):
+        now = timezone.now()
+        # new devices get a deadline two minutes after creation
+        self.assertEqual(check_offline_devices(now), {"created": 0, "touched": 0})
+
+        later = now + timedelta(minutes=3)
+        Device.objects.filter(pk=self.devices[5].pk).update(is_active=False)
+        heartbeat.write_last_seen({self.devices[0].pk: later - timedelta(seconds=30)})
+
+        result = check_offline_devices(later)
+
+        self.assertEqual(result, {"created": 4, "touched": 0})
+        reported = set(
+            Alert.objects.filter(alert_type=Alert.DEVICE_OFFLINE).values_list(
+                "device__device_code", flat=True
+            )
+        )
+        self.assertEqual(reported, {"Z0-D1", "Z0-D2", "Z1-D0", "Z1-D1"})
+        self.assertFalse(
+            Device.objects.filter(pk__in=[d.pk for d in self.devices[1:5]])
+            .exclude(offline_deadline=None)
+            .exists()
+        )
+        # cleared deadlines are not picked up again
+        self.assertEqual(check_offline_devices(later), {"created": 0, "touched": 0})
+
+    def test_heartbeat_moves_the_deadline_forward(self):
+        seen_at = timezone.now() + timedelta(minutes=10)
+        heartbeat.record_heartbeats([self.devices[0].pk], seen_at)
+        heartbeat.flush_heartbeats()
+
+        self.devices[0].refresh_from_db()
+        self.assertEqual(self.devices[0].offline_deadline, seen_at + timedelta(minutes=2))
+        self.assertEqual(
+            check_offline_devices(seen_at + timedelta(minutes=1))["created"], 5
+        )
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class AlertUpsertTests(FleetMixin, TestCase):
+    def _upsert(self, keys, now, severity=Alert.WARNING):
+        return upsert_alerts(
+            [
+                (device.pk, alert_type, severity, f"{alert_type} {now}")
+                for device, alert_type in keys
+            ],
+            now,
+        )
+
+    def test_second_upsert_touches_instead_of_creating(self):
+        now = timezone.now()
+        keys = [(self.devices[0], Alert.HIGH_POWER), (self.devices[1], Alert.HIGH_POWER)]
+
+        first = self._upsert(keys, now)
+        # same timestamp: "created" must not be inferred from the times
+        second = self._upsert(
+            keys + [(self.devices[2], Alert.HIGH_POWER)], now, Alert.CRITICAL
+        )
+
+        self.assertEqual([a.created for a in first], [True, True])
+        self.assertEqual(
+            sorted((a.device_id, a.created) for a in second),
+            [
+                (self.devices[0].pk, False),
+                (self.devices[1].pk, False),
+                (self.devices[2].pk, True),
+            ],
+        )
+        self.assertEqual(Alert.objects.count(), 3)
+        self.assertEqual(
+            set(Alert.objects.values_list("severity", flat=True)), {Alert.CRITICAL}
+        )
+        touched = next(a for a in second if a.device_id == self.devices[0].pk)
+        self.assertEqual(touched.pk, first[0].pk)
+
+    def test_resolved_alert_is_reopened_as_a_new_one(self):
+        now = timezone.now()
+        [alert] = self._upsert([(self.devices[0], Alert.HIGH_POWER)], now)
+        Alert.objects.filter(pk=alert.pk).update(status=Alert.RESOLVED)
+
+        [reopened] = self._upsert(
+            [(self.devices[0], Alert.HIGH_POWER)], now + timedelta(minutes=1)
+        )
+
+        self.assertTrue(reopened.created)
+        self.assertNotEqual(reopened.pk, alert.pk)
+        self.assertEqual(Alert.objects.filter(status=Alert.ACTIVE).count(), 1)
+
+    def test_index_rejects_a_second_active_alert(self):
+        self._upsert([(self.devices[0], Alert.HIGH_POWER)], timezone.now())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Alert.objects.create(
+                device=self.devices[0],
+                alert_type=Alert.HIGH_POWER,
+                severity=Alert.INFO,
+                message="duplicate",
+            )
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class AlertRecoveryTests(FleetMixin, TestCase):
+    def _alert(self, device, alert_type, status=Alert.ACTIVE):
+        return Alert.objects.create(
+            device=device,
+            alert_type=alert_type,
+            severity=Alert.CRITICAL,
+            status=status,
+            message="",
+        )
+
+    def test_reporting_devices_resolve_their_offline_alerts(self):
+        now = timezone.now().replace(microsecond=0)
+        offline = self._alert(self.devices[0], Alert.DEVICE_OFFLINE)
+        acked = self._alert(self.devices[1], Alert.DEVICE_OFFLINE, Alert.ACK)
+        silent = self._alert(self.devices[2], Alert.DEVICE_OFFLINE)
+        power = self._alert(self.devices[0], Alert.HIGH_POWER)
+
+        self.post_telemetry([reading("Z0-D0", now - timedelta(minutes=1))])
+        self.post_logs([log("Z0-D1", True, now - timedelta(minutes=1))])
+
+        statuses = dict(Alert.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[offline.pk], Alert.RESOLVED)
+        self.assertEqual(statuses[acked.pk], Alert.RESOLVED)
+        self.assertEqual(statuses[silent.pk], Alert.ACTIVE)
+        self.assertEqual(statuses[power.pk], Alert.ACTIVE)
+        self.assertIsNotNone(Alert.objects.get(pk=offline.pk).resolved_at)
+
+    def test_single_row_posts_record_a_heartbeat(self):
+        now = timezone.now().replace(microsecond=0)
+        Device.objects.update(
+            last_seen=now - timedelta(minutes=10), offline_deadline=now - timedelta(minutes=8)
+        )
+        check_offline_devices(now=now)
+        self.assertEqual(Alert.objects.filter(status=Alert.ACTIVE).count(), 6)
+
+        for url, record in (
+            ("/api/telemetry/", reading("Z0-D0", now - timedelta(seconds=30))),
+            ("/api/parking-log/", log("Z0-D1", True, now - timedelta(seconds=30))),
+        ):
+            response = self.client.post(url, record, format="json")
+            self.assertEqual(response.status_code, 201, response.content)
+        heartbeat.flush_heartbeats()
+
+        statuses = {
+            d["device_code"]: d["status"]
+            for d in self.client.get("/api/devices/status/").json()["results"]
+        }
+        self.assertEqual((statuses["Z0-D0"], statuses["Z0-D1"]), ("OK", "OK"))
+        self.assertEqual(statuses["Z0-D2"], "OFFLINE")
+        for device in self.devices[:2]:
+            device.refresh_from_db()
+            self.assertIsNotNone(device.offline_deadline)
+
+    def test_replayed_rows_do_not_resolve(self):
+        now = timezone.now().replace(microsecond=0)
+        self.post_logs([log("Z0-D0", True, now - timedelta(minutes=1))])
+        offline = self._alert(self.devices[0], Alert.DEVICE_OFFLINE)
+
+        self.post_logs([log("Z0-D0", True, now - timedelta(minutes=1))])
+
+        offline.refresh_from_db()
+        self.assertEqual(offline.status, Alert.ACTIVE)
+
+
+@override_settings(CACHES=NO_CACHE)
+class AlertBulkActionTests(FleetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alerts = {
+            (device.device_code, alert_type): Alert.objects.create(
+                device=device,
+                alert_type=alert_type,
+                severity=Alert.WARNING,
+                message="",
+            )
+            for device in self.devices
+            for alert_type in (Alert.DEVICE_OFFLINE, Alert.HIGH_POWER)
+        }
+
+    def _statuses(self):
+        statuses = dict(Alert.objects.values_list("pk", "status"))
+        return {key: statuses[alert.pk] for key, alert in self.alerts.items()}
+
+    def test_acknowledge_by_filter(self):
+        response = self.client.patch(
+            "/api/alerts/ack/?zone_code=Z1&alert_type=HIGH_POWER", {}, format="json"
+        )
+
+        self.assertEqual(response.json(), {"updated": 3})
+        acked = {key for key, value in self._statuses().items() if value == Alert.ACK}
+        self.assertEqual(acked, {(f"Z1-D{d}", Alert.HIGH_POWER) for d in range(3)})
+
+    def test_resolve_by_ids_skips_other_statuses(self):
+        first = self.alerts[("Z0-D0", Alert.DEVICE_OFFLINE)]
+        second = self.alerts[("Z0-D1", Alert.DEVICE_OFFLINE)]
+        Alert.objects.filter(pk=second.pk).update(status=Alert.ACK)
+        done = self.alerts[("Z0-D2", Alert.DEVICE_OFFLINE)]
+        Alert.objects.filter(pk=done.pk).update(status=Alert.RESOLVED)
+
+        response = self.client.patch(
+            "/api/alerts/resolve/",
+            {"ids": [first.pk, second.pk, done.pk]},
+            format="json",
+        )
+
+        self.assertEqual(response.json(), {"updated": 2})
+        for alert in (first, second):
+            alert.refresh_from_db()
+            self.assertEqual(alert.status, Alert.RESOLVED)
+            self.assertIsNotNone(alert.resolved_at)
+        # acknowledging only applies to ACTIVE alerts
+        response = self.client.patch(
+            "/api/alerts/ack/", {"ids": [first.pk]}, format="json"
+        )
+        self.assertEqual(response.json(), {"updated": 0})
+
+    def test_needs_ids_or_a_filter(self):
+        response = self.client.patch("/api/alerts/resolve/", {}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Alert.objects.exclude(status=Alert.ACTIVE).exists())
+
+
+@override_settings(
+    CACHES=NO_CACHE,
+    HEARTBEAT_BUFFER_BACKEND="memory",
+    TIMESERIES_RETENTION={"telemetry": 30, "parking_log": 30},
+)
+class RetentionTests(FleetMixin, TestCase):
+    def _hourly(self, day):
+        return self.client.get(
+            "/api/metrics/hourly-usage/", {"date": day.date().isoformat()}
+        ).json()["hourly"]
+
+    def test_prune_keeps_the_rollups(self):
+        old, recent = local_day(12), local_day(2)
+        self.post_logs([log("Z0-D0", True, old), log("Z0-D1", False, recent)])
+        self.post_telemetry([reading("Z0-D0", old)])
+        before = self._hourly(old)
+
+        result = prune_timeseries(days=10)
+
+        self.assertEqual(result["parking_log"]["deleted"], 1)
+        self.assertEqual(result["telemetry"]["deleted"], 1)
+        self.assertEqual(
+            list(ParkingLog.objects.values_list("timestamp", flat=True)), [recent]
+        )
+        self.assertEqual(self._hourly(old), before)
+        self.assertTrue(TelemetryRollup.objects.filter(bucket__lte=old).exists())
+
+    def test_ingest_skips_rows_past_retention(self):
+        old = local_day(12)
+        self.post_logs([log("Z0-D0", True, old)])
+        with override_settings(TIMESERIES_RETENTION={"parking_log": 10}):
+            prune_timeseries(["parking_log"])
+            before = self._hourly(old)
+
+            result = self.post_logs(
+                [
+                    log("Z0-D0", False, old + timedelta(minutes=1)),
+                    log("Z0-D1", True, local_day(1)),
+                ]
+            )
+            response = self.client.post(
+                "/api/parking-log/",
+                {"device_code": "Z0-D0", "is_occupied": True, "timestamp": old.isoformat()},
+                format="json",
+            )
+
+        self.assertEqual((result["inserted"], result["skipped"]), (1, 1))
+        self.assertEqual(self._hourly(old), before)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("timestamp", response.json())
+
+    def test_ingest_skips_rows_past_a_shorter_prune(self):
+        old = local_day(12)
+        self.post_logs([log("Z0-D0", True, old)])
+        prune_timeseries(["parking_log"], days=10)
+        before = self._hourly(old)
+
+        result = self.post_logs([log("Z0-D0", False, old + timedelta(minutes=1))])
+        prune_timeseries(["parking_log"], days=20)
+
+        self.assertEqual((result["inserted"], result["skipped"]), (0, 1))
+        self.assertEqual(self._hourly(old), before)
+        self.assertEqual(
+            RetentionCutoff.objects.get(kind="parking_log").cutoff, retention_cutoff(10)
+        )
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class ExportFormatTests(FleetMixin, TestCase):
+    def _export(self, **params):
+        response = self.client.get("/api/parking-log/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_timestamps_keep_their_microseconds(self):
+        ts = local_day(1).replace(microsecond=123456)
+        self.post_logs([log("Z0-D0", True, ts)])
+        iso = ts.astimezone(dt_timezone.utc).isoformat().replace("+00:00", "Z")
+
+        self.assertIn(iso, self._export(fmt="csv"))
+        self.assertEqual(
+            json.loads(self._export(fmt="ndjson"))["timestamp"],
+            self.client.get("/api/parking-log/").json()["results"][0]["timestamp"],
+        )
+        self.assertIn(iso, self._export(fmt="ndjson"))
+
+    def test_invalid_facility_is_a_400(self):
+        response = self.client.get("/api/parking-log/export/", {"facility": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._export(facility=self.facility.pk).count("\n"), 1)
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class DetachedMonthTests(FleetMixin, TestCase):
+    """A month moved to its partition file reads the same through the API."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(
+            TIMESERIES_PARTITION_DIR=f"{directory}/partitions",
+            TIMESERIES_ARCHIVE_DIR=f"{directory}/archive",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.day = local_day(40)
+        self.post_logs(
+            [
+                log("Z0-D0", True, self.day),
+                log("Z0-D0", False, self.day + timedelta(minutes=30)),
+                log("Z0-D1", True, self.day + timedelta(minutes=10)),
+                log("Z1-D0", True, self.day + timedelta(hours=2)),
+            ]
+        )
+        self.post_telemetry([reading("Z0-D0", self.day), reading("Z0-D0", self.day, 230.0)])
+
+    def _move(self):
+        month = month_of(self.day)
+        detach_month(TimeSeriesPartition.PARKING_LOG, month)
+        detach_month(TimeSeriesPartition.TELEMETRY, month)
+
+    def _summary(self, **params):
+        response = self.client.get(
+            "/api/dashboard/summary/", {"date": self.day.date().isoformat(), **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _export(self, kind):
+        response = self.client.get(f"/api/{kind}/export/", {"fmt": "ndjson"})
+        return b"".join(response.streaming_content)
+
+    def test_dashboard_numbers_survive_the_detach(self):
+        before = [self._summary(), self._summary(zone_code="Z0")]
+        self.assertEqual(before[0]["total_parking_events"], 4)
+        self.assertEqual(before[0]["current_occupancy_count"], 2)
+
+        self._move()
+
+        self.assertFalse(ParkingLog.objects.exists())
+        self.assertEqual([self._summary(), self._summary(zone_code="Z0")], before)
+
+    def test_readers_skip_rows_waiting_for_deletion(self):
+        before = [self._summary(), self._export("parking-log")]
+        depth = len(connection.atomic_blocks)
+        seen = []
+
+        def delete(queryset, batch_size):
+            # the catalog row is committed, no transaction spans the deletes
+            seen.append(
+                (len(connection.atomic_blocks), self._summary(), self._export("parking-log"))
+            )
+            return delete_in_pk_batches(queryset, batch_size)
+
+        with mock.patch(
+            "apps.parking.services.partitions.delete_in_pk_batches", side_effect=delete
+        ):
+            detach_month(TimeSeriesPartition.PARKING_LOG, month_of(self.day))
+
+        self.assertEqual(seen, [(depth, *before)])
+        self.assertFalse(ParkingLog.objects.exists())
+
+    def test_export_round_trips_through_the_partition(self):
+        before = [self._export("parking-log"), self._export("telemetry")]
+        self._move()
+        self.assertEqual([self._export("parking-log"), self._export("telemetry")], before)
+
+    def test_late_rows_for_a_detached_month_are_skipped(self):
+        self._move()
+        hourly = list(ParkingLogHourly.objects.values_list("hour", "total_events"))
+        rollups = list(TelemetryRollup.objects.values_list("bucket", "samples", "voltage_sum"))
+
+        late = self.day + timedelta(minutes=5)
+        logs = self.post_logs([log("Z0-D0", True, late)])
+        telemetry = self.post_telemetry([reading("Z0-D0", late)])
+        exported = self._export("parking-log")
+        self._move()
+
+        self.assertEqual((logs["inserted"], logs["skipped"]), (0, 1))
+        self.assertEqual((telemetry["inserted"], telemetry["skipped"]), (0, 1))
+        self.assertEqual(
+            list(ParkingLogHourly.objects.values_list("hour", "total_events")), hourly
+        )
+        self.assertEqual(
+            list(TelemetryRollup.objects.values_list("bucket", "samples", "voltage_sum")),
+            rollups,
+        )
+        self.assertEqual(self._export("parking-log"), exported)
+
+    def test_lists_point_detached_ranges_to_the_export(self):
+        row_id = ParkingLog.objects.values_list("id", flat=True).first()
+        self._move()
+
+        response = self.client.get(
+            "/api/parking-log/", {"timestamp__gte": self.day.isoformat()}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("/api/parking-log/export/", response.json()["timestamp"][0])
+
+        response = self.client.get(f"/api/parking-log/{row_id}/")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("/api/parking-log/export/", response.json()["detail"])
+
+        recent = self.client.get(
+            "/api/parking-log/", {"timestamp__gte": local_day(1).isoformat()}
+        )
+        self.assertEqual(recent.status_code, 200)
+
+
+class ArchivedDayTests(DetachedMonthTests):
+    """The same for a day moved to the columnar archive."""
+
+    def _move(self):
+        day = self.day.date()
+        # several chunks per day
+        with mock.patch("apps.parking.services.archive.ARCHIVE_CHUNK_SIZE", 2):
+            archive_day(TimeSeriesPartition.PARKING_LOG, day)
+            archive_day(TimeSeriesPartition.TELEMETRY, day)
+
+    def test_archive_of_a_detached_month_round_trips(self):
+        before = [self._export("parking-log"), self._export("telemetry")]
+        month = month_of(self.day)
+        detach_month(TimeSeriesPartition.PARKING_LOG, month)
+        detach_month(TimeSeriesPartition.TELEMETRY, month)
+        self._move()
+
+        partition = TimeSeriesPartition.objects.get(kind=TimeSeriesPartition.PARKING_LOG)
+        self.assertEqual(partition.rows, 0)
+        self.assertEqual([self._export("parking-log"), self._export("telemetry")], before)
+        self.assertEqual(self._summary()["total_parking_events"], 4)
+
+    def _move_logs_watching(self, name):
+        """Archive the day's logs, reading the API whenever `name` deletes some."""
+        real = getattr(archive, name)
+        depth = len(connection.atomic_blocks)
+        seen = []
+
+        def delete(*args):
+            seen.append(
+                (len(connection.atomic_blocks), self._summary(), self._export("parking-log"))
+            )
+            return real(*args)
+
+        with mock.patch.object(archive, name, side_effect=delete):
+            archive_day(TimeSeriesPartition.PARKING_LOG, self.day.date())
+        return depth, seen
+
+    def test_readers_skip_rows_waiting_for_deletion(self):
+        before = [self._summary(), self._export("parking-log")]
+
+        depth, seen = self._move_logs_watching("delete_in_pk_batches")
+
+        self.assertEqual(seen, [(depth, *before)])
+        self.assertFalse(ParkingLog.objects.exists())
+
+    def test_readers_skip_partition_rows_waiting_for_deletion(self):
+        before = [self._summary(), self._export("parking-log")]
+        detach_month(TimeSeriesPartition.PARKING_LOG, month_of(self.day))
+
+        _, seen = self._move_logs_watching("delete_partition_range")
+
+        self.assertEqual([reads for _, *reads in seen], [before])
+
+    def test_rows_written_during_the_read_are_caught_up(self):
+        late = ParkingLog(
+            device=self.devices[1], is_occupied=False, timestamp=self.day + timedelta(hours=1)
+        )
+        real_store = archive._store_day
+
+        def store_then_write(kind, path, arrays):
+            # a row committed between the read and the final transaction
+            if kind == TimeSeriesPartition.PARKING_LOG and late.pk is None:
+                late.save()
+            real_store(kind, path, arrays)
+
+        with mock.patch.object(archive, "_store_day", store_then_write):
+            moved = archive_day(TimeSeriesPartition.PARKING_LOG, self.day.date())
+
+        self.assertEqual(moved, 5)
+        self.assertFalse(ParkingLog.objects.exists())
+        self.assertEqual(self._summary()["total_parking_events"], 5)
+
+
+class SingleWriterTests(SimpleTestCase):
+    """The writer thread's bookkeeping, with its transactions stubbed out."""
+
+    def setUp(self):
+        for name, value in (
+            ("transaction", SimpleNamespace(atomic=nullcontext)),
+            ("close_old_connections", lambda: None),
+        ):
+            patcher = mock.patch.object(writer, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # long enough a group wait that concurrent writes commit together
+        self.writer = writer.SingleWriter(wait=0.2)
+
+    def _run_together(self, *fns):
+        with ThreadPoolExecutor(len(fns)) as pool:
+            futures = [pool.submit(self.writer.run, fn, 5) for fn in fns]
+        return futures
+
+    def test_a_failing_write_only_fails_its_caller(self):
+        def fail():
+            raise ValueError("bad row")
+
+        failed, ok = self._run_together(fail, lambda: 42)
+
+        self.assertIsInstance(failed.exception(), ValueError)
+        self.assertEqual(ok.result(), 42)
+
+    def test_every_caller_fails_when_the_connection_cannot_be_reset(self):
+        gone = OperationalError("connection gone")
+        with mock.patch.object(writer, "close_old_connections", side_effect=gone):
+            futures = self._run_together(lambda: 1, lambda: 2)
+
+        self.assertEqual([f.exception() for f in futures], [gone, gone])
+        # the writer thread survived
+        self.assertEqual(self.writer.run(lambda: 3), 3)
+
+    def test_a_caller_gives_up_after_the_timeout(self):
+        self.writer.wait = 0
+        started, gate, dropped = threading.Event(), threading.Event(), []
+
+        def slow_write():
+            started.set()
+            return gate.wait(5)
+
+        with ThreadPoolExecutor(1) as pool:
+            blocking = pool.submit(self.writer.run, slow_write, 5)
+            started.wait(5)
+            with self.assertRaises(OperationalError):
+                self.writer.run(lambda: dropped.append(1), timeout=0.05)
+            gate.set()
+
+        self.assertTrue(blocking.result())
+        self.assertEqual(self.writer.run(lambda: 4), 4)
+        self.assertEqual(dropped, [])
+
+
+class RunWriteTests(TestCase):
+    @override_settings(INGEST_SINGLE_WRITER=True)
+    def test_runs_inline_inside_a_transaction(self):
+        # the test case's transaction: the writer's connection could not see it
+        self.assertIs(writer.run_write(threading.current_thread), threading.current_thread())
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class IngestCountTests(FleetMixin, TestCase):
+    """inserted/skipped are the rows that did and did not land, exactly."""
+
+    def _rollups(self):
+        return list(
+            TelemetryRollup.objects.order_by("id").values_list(
+                "resolution", "bucket", "samples", "voltage_sum", "updated_at"
+            )
+        )
+
+    def test_duplicates_are_skipped_and_leave_the_rollups_alone(self):
+        base = local_day(1)
+        self.post_telemetry([reading("Z0-D0", base), reading("Z0-D1", base)])
+        self.post_logs([log("Z0-D0", True, base)])
+        rollups = self._rollups()
+        hourly = list(ParkingLogHourly.objects.values_list("total_events", "updated_at"))
+
+        # same keys with other values: the stored rows win
+        telemetry = self.post_telemetry(
+            [reading("Z0-D0", base, voltage=250.0), reading("Z0-D1", base, voltage=250.0)]
+        )
+        logs = self.post_logs([log("Z0-D0", False, base)])
+
+        self.assertEqual(
+            (telemetry["received"], telemetry["inserted"], telemetry["skipped"]), (2, 0, 2)
+        )
+        self.assertEqual((logs["received"], logs["inserted"], logs["skipped"]), (1, 0, 1))
+        self.assertEqual(self._rollups(), rollups)
+        self.assertEqual(
+            list(ParkingLogHourly.objects.values_list("total_events", "updated_at")), hourly
+        )
+
+    def test_single_row_posts_go_through_the_writer(self):
+        ts = local_day(1).isoformat()
+        with mock.patch(
+            "apps.parking.serializer.run_write", wraps=writer.run_write
+        ) as run_write:
+            responses = [
+                self.client.post("/api/telemetry/", reading("Z0-D0", local_day(1)), format="json"),
+                self.client.post(
+                    "/api/parking-log/",
+                    {"device_code": "Z0-D0", "is_occupied": True, "timestamp": ts},
+                    format="json",
+                ),
+            ]
+
+        self.assertEqual([r.status_code for r in responses], [201, 201])
+        self.assertEqual(run_write.call_count, 2)
+        self.assertEqual(ParkingLogHourly.objects.get().total_events, 1)
+
+    def test_counts_are_exact_across_insert_batches(self):
+        base = local_day(1)
+        self.post_telemetry([reading("Z0-D0", base + timedelta(minutes=m)) for m in (1, 3)])
+        records = [reading("Z0-D0", base + timedelta(minutes=m)) for m in range(5)]
+        # a duplicate within the request, in another statement than its first copy
+        records.append(reading("Z0-D0", base))
+
+        with mock.patch("apps.parking.services.upsert.INSERT_BATCH_SIZE", 2):
+            result = self.post_telemetry(records)
+            body = "".join(
+                json.dumps(reading("Z0-D1", base + timedelta(minutes=m))) + "\n"
+                for m in (0, 1, 1, 2)
+            )
+            ndjson = self.client.post(
+                "/api/telemetry/bulk/", body, content_type="application/x-ndjson"
+            ).json()
+
+        self.assertEqual((result["received"], result["inserted"], result["skipped"]), (6, 3, 3))
+        self.assertEqual((ndjson["received"], ndjson["inserted"], ndjson["skipped"]), (4, 3, 1))
+        self.assertEqual(Telemetry.objects.filter(device=self.devices[0]).count(), 5)
+        self.assertEqual(Telemetry.objects.filter(device=self.devices[1]).count(), 3)
+        minute = TelemetryRollup.objects.get(
+            device=self.devices[0], resolution=TelemetryRollup.MINUTE, bucket=base
+        )
+        self.assertEqual(minute.samples, 1)
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class AsyncIngestTests(FleetMixin, TestCase):
+    """?async=true batches, run eagerly with an in-memory result backend."""
+
+    def setUp(self):
+        super().setUp()
+        # the app reads the CELERY_-prefixed Django settings names
+        eager = {
+            "CELERY_TASK_ALWAYS_EAGER": True,
+            "CELERY_TASK_STORE_EAGER_RESULT": True,
+            "CELERY_RESULT_BACKEND": "cache+memory://",
+        }
+        self.addCleanup(celery_app.conf.update, {k: celery_app.conf.get(k) for k in eager})
+        celery_app.conf.update(eager)
+        patcher = mock.patch.object(celery_app, "_backend_cache", celery_app._get_backend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _queue(self, records):
+        response = self.client.post(
+            "/api/parking-log/bulk/?async=true", {"records": records}, format="json"
+        )
+        self.assertEqual(response.status_code, 202, response.content)
+        queued = response.json()
+        self.assertEqual(queued["status"], "QUEUED")
+        return queued, self.client.get(queued["status_url"]).json()
+
+    def test_queued_batch_is_inserted_and_reported_done(self):
+        base = local_day(1)
+        queued, batch = self._queue([log("Z0-D0", True, base), log("Z0-D0", True, base)])
+
+        self.assertEqual(batch["batch_id"], queued["batch_id"])
+        self.assertEqual(batch["status"], "SUCCESS")
+        self.assertEqual(
+            batch["result"],
+            {"status": "done", "inserted": 1, "received": 2, "skipped": 1},
+        )
+        self.assertEqual(ParkingLog.objects.count(), 1)
+
+    def test_invalid_batch_is_rejected_by_the_task(self):
+        _, batch = self._queue([log("NOPE", True, local_day(1))])
+
+        self.assertEqual(batch["status"], "SUCCESS")
+        self.assertEqual(batch["result"]["status"], "rejected")
+        self.assertIn("device_code", batch["result"]["errors"]["records"][0])
+        self.assertFalse(ParkingLog.objects.exists())
+
+    def test_unknown_batch_is_pending(self):
+        response = self.client.get("/api/ingest/batches/not-a-batch/")
+        self.assertEqual(
+            response.json(), {"batch_id": "not-a-batch", "status": "PENDING", "result": None}
+        )
+
+    def test_envelope_and_ndjson_are_refused(self):
+        response = self.client.post(
+            "/api/parking-log/bulk/?async=true", {"records": []}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            "/api/parking-log/bulk/?async=true",
+            json.dumps(log("Z0-D0", True, local_day(1))) + "\n",
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ParkingLog.objects.exists())
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class ValuesListTests(FleetMixin, TestCase):
+    """The values() list fast path renders what the model serializers render."""
+
+    def setUp(self):
+        super().setUp()
+        base = local_day(1).replace(microsecond=654321)
+        self.post_telemetry([reading("Z0-D0", base), reading("Z1-D2", base, 231.25)])
+        self.post_logs([log("Z0-D1", True, base), log("Z1-D0", False, base)])
+        upsert_alerts(
+            [(self.devices[0].pk, Alert.DEVICE_OFFLINE, "HIGH", "offline")], now=base
+        )
+
+    def test_output_matches_the_model_serializers(self):
+        for url, serializer, queryset in (
+            ("/api/telemetry/", TelemetrySerializer, Telemetry.objects.all()),
+            ("/api/parking-log/", ParkingLogSerializer, ParkingLog.objects.all()),
+            ("/api/alerts/", AlertSerializer, Alert.objects.all()),
+        ):
+            data = self.client.get(url).json()
+            # the time-series lists are cursor-paginated, alerts are not
+            results = data["results"] if isinstance(data, dict) else data
+            queryset = queryset.order_by("timestamp", "id") if isinstance(data, dict) else queryset
+            expected = json.loads(JSONRenderer().render(serializer(queryset, many=True).data))
+            self.assertEqual(results, expected, url)
+
+
+@override_settings(CACHES=NO_CACHE, HEARTBEAT_BUFFER_BACKEND="memory")
+class SparseFieldsTests(FleetMixin, TestCase):
+    def _get(self, url, fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"fields": fields})
+        return response, [q["sql"] for q in queries.captured_queries]
+
+    def test_values_lists_select_and_return_only_the_requested_fields(self):
+        base = local_day(1)
+        self.post_telemetry([reading("Z0-D0", base), reading("Z0-D1", base, 231.0)])
+
+        response, sql = self._get("/api/telemetry/", "voltage,device_code")
+
+        self.assertEqual(response.status_code, 200)
+        # serializer order, and the cursor columns are not in the output
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"device_code": "Z0-D0", "voltage": 220.0},
+                {"device_code": "Z0-D1", "voltage": 231.0},
+            ],
+        )
+        select = sql[-1].split(" FROM ")[0]
+        self.assertIn('"voltage"', select)
+        self.assertIn('"device_code"', select)
+        # selected for the cursor only
+        self.assertIn('"timestamp"', select)
+        self.assertNotIn('"current"', select)
+        self.assertNotIn('"power_factor"', select)
+
+    def test_model_lists_defer_the_other_columns(self):
+        response, sql = self._get("/api/devices/", "device_code")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), [{"device_code": d.device_code} for d in self.devices]
+        )
+        select = sql[-1].split(" FROM ")[0]
+        self.assertIn('"device_code"', select)
+        self.assertNotIn('"last_seen"', select)
+
+    def test_unknown_fields_are_a_400(self):
+        response = self.client.get("/api/telemetry/", {"fields": "voltage,nope,bogus"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": ["Unknown field(s): bogus, nope."]})
@@ -8,15 +8,22 @@ from .views import (
     DeviceDetail,
     TelemetryList,
     TelemetryDetail,
+    TelemetrySeriesView,
+    TelemetryExportView,
+    ParkingLogExportView,
     BulkTelemetryList,
     ParkingLogList,
     ParkingLogDetail,
+    BulkParkingLogList,
+    IngestBatchStatusView,
     ParkingTargetList,
     DashboardSummaryList,
     HourlyUsageView,
     AlertList,
     AlertAcknowledgeView,
     AlertResolveView,
+    AlertBulkAcknowledgeView,
+    AlertBulkResolveView,
     DeviceStatusView,
 )
 
@@ -37,6 +44,8 @@ urlpatterns = [
     # telemetry urls
     path("telemetry/", TelemetryList.as_view(), name="telemetry-list"),
     path("telemetry/<int:pk>/", TelemetryDetail.as_view(), name="telemetry-detail"),
+    path("telemetry/series/", TelemetrySeriesView.as_view(), name="telemetry-series"),
+    path("telemetry/export/", TelemetryExportView.as_view(), name="telemetry-export"),
     # bulk telemetry urls
     path("telemetry/bulk/", BulkTelemetryList.as_view(), name="bulk-telemetry-list"),
     # parking urls
@@ -44,6 +53,19 @@ urlpatterns = [
     path(
         "parking-log/<int:pk>/", ParkingLogDetail.as_view(), name="parking-log-detail"
     ),
+    path(
+        "parking-log/bulk/", BulkParkingLogList.as_view(), name="bulk-parking-log-list"
+    ),
+    path(
+        "parking-log/export/",
+        ParkingLogExportView.as_view(),
+        name="parking-log-export",
+    ),
+    path(
+        "ingest/batches/<str:batch_id>/",
+        IngestBatchStatusView.as_view(),
+        name="ingest-batch-status",
+    ),
     path("parking-target/", ParkingTargetList.as_view(), name="parking-target-list"),
     # dashboard urls
     path(
@@ -53,5 +75,7 @@ urlpatterns = [
     path("alerts/", AlertList.as_view(), name="alert-list"),
     path("alerts/<int:pk>/ack/", AlertAcknowledgeView.as_view(), name="alert-ack"),
     path("alerts/<int:pk>/resolve/", AlertResolveView.as_view(), name="alert-resolve"),
+    path("alerts/ack/", AlertBulkAcknowledgeView.as_view(), name="alert-bulk-ack"),
+    path("alerts/resolve/", AlertBulkResolveView.as_view(), name="alert-bulk-resolve"),
     path("devices/status/", DeviceStatusView.as_view(), name="device-status"),
 ]
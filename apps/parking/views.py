@@ -8,6 +8,10 @@ from .models import (
     ParkingLog,
     ParkingTarget,
     Alert,
+    DeviceCurrentState,
+    ParkingLogHourly,
+    TelemetryRollup,
+    TimeSeriesPartition,
 )
 from .serializer import (
     ParkingFacilitySerializer,
@@ -16,27 +20,188 @@ from .serializer import (
     TelemetrySerializer,
     TelemetryBulkSerializer,
     ParkingLogSerializer,
+    ParkingLogBulkSerializer,
+    BulkEnvelopeSerializer,
     ParkingTargetSerializer,
     AlertSerializer,
+    AlertBulkActionSerializer,
+    TelemetryValuesSerializer,
+    ParkingLogValuesSerializer,
+    AlertValuesSerializer,
 )
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework import status
-from django.db.models import Count, Max, Q, Sum
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
 from django.utils import timezone
 
 from datetime import datetime, time, timedelta
-from django.utils.dateparse import parse_date
-from django.db.models.functions import TruncHour
+from django.utils.dateparse import parse_date, parse_datetime
+from .services.ingest import NDJSON_CONTENT_TYPE, ingest_ndjson
+from .services.export import (
+    export_rows,
+    stream_csv,
+    stream_ndjson,
+)
+from .services.archive import archived_until, is_archived, iter_archive_rows
+from .services.partitions import (
+    detached_until,
+    iter_partition_rows,
+    merge_by_timestamp,
+    partitions_for,
+)
+from .services.rollups import TELEMETRY_METRICS, TELEMETRY_RESOLUTIONS, floor_time
+from .services.response_cache import (
+    ALERTS_TOPIC,
+    DEVICES_TOPIC,
+    PARKING_TOPIC,
+    bump_devices,
+    bump_zones,
+    request_scopes,
+    response_digest,
+    response_key,
+    scope_state,
+    topic_scopes,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.core.cache import cache
+import logging
+from .tasks import ingest_bulk
+from .pagination import TimeSeriesCursorPagination
+from .filters import AlertFilter
+from celery.result import AsyncResult
+from rest_framework.reverse import reverse
+
+logger = logging.getLogger(__name__)
+
+
+# ?fields=a,b sparse fieldsets for list endpoints
+class SparseFieldsMixin:
+    def get_requested_fields(self):
+        """Requested field names in serializer order, None for all fields."""
+        raw = self.request.query_params.get("fields")
+        if not raw:
+            return None
+        allowed = self.get_serializer_class().Meta.fields
+        requested = {name.strip() for name in raw.split(",") if name.strip()}
+        unknown = sorted(requested - set(allowed))
+        if unknown:
+            raise ValidationError(
+                {"fields": [f"Unknown field(s): {', '.join(unknown)}."]}
+            )
+        return [name for name in allowed if name in requested] or None
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_requested_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        if fields:
+            columns = {f.name for f in queryset.model._meta.concrete_fields}
+            queryset = queryset.only(*[name for name in fields if name in columns])
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True, fields=fields)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True, fields=fields)
+        return Response(serializer.data)
+
+
+# list fast path: values() rows instead of model instances + serializer fields
+class ValuesListMixin(SparseFieldsMixin):
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_requested_fields() or self.values_serializer_class.fields
+        # the cursor is built from the ordering columns, select them even if
+        # they are not requested and drop them from the output afterwards
+        ordering = [
+            name.lstrip("-") for name in getattr(self.paginator, "ordering", ())
+        ]
+        columns = fields + [name for name in ordering if name not in fields]
+        queryset = self.values_serializer_class.values(
+            self.filter_queryset(self.get_queryset()), columns
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self._trim(page, fields, columns))
+        return Response(self._trim(queryset, fields, columns))
+
+    def _trim(self, rows, fields, columns):
+        if len(columns) == len(fields):
+            return list(rows)
+        return [{name: row[name] for name in fields} for row in rows]
+
+
+# the time-series lists and details read the main table only; rows moved to
+# detached months or the archive are served by the export endpoints
+class MainTableMixin:
+    timeseries_kind = None
+    export_url_name = None
+
+    def _moved_until(self):
+        """End of the newest rows moved out of the main table, None if none."""
+        ends = [detached_until(self.timeseries_kind), archived_until(self.timeseries_kind)]
+        return max([end for end in ends if end is not None], default=None)
+
+    def _moved_hint(self, until):
+        url = reverse(self.export_url_name, request=self.request)
+        return (
+            f"Rows before {until.isoformat()} are no longer in the main table, "
+            f"export them from {url}."
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        bounds = [
+            parse_time_param(self.request.query_params[name])
+            for name in ("timestamp__gte", "timestamp__lt")
+            if self.request.query_params.get(name)
+        ]
+        bounds = [bound for bound in bounds if bound is not None]
+        if bounds:
+            until = self._moved_until()
+            if until is not None and min(bounds) < until:
+                raise ValidationError({"timestamp": [self._moved_hint(until)]})
+        return queryset
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            until = self._moved_until()
+            if until is None:
+                raise
+            raise NotFound(f"Not found. {self._moved_hint(until)}")
+
+
+# creates of the rows the cached dashboards read (zones, devices, targets):
+# bump the written zone's scopes like ingest does
+class BumpOnCreateMixin:
+    bump_topics = ()
+
+    def written_zone(self, instance):
+        return instance.parking_zone
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        zone = self.written_zone(serializer.instance)
+        bump_zones([(zone.code, zone.parking_facility_id)], self.bump_topics)
 
 
 # -------------------parking facility views-------------------
 # parking facility views
 class ParkingFacilityList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    SparseFieldsMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     queryset = ParkingFacility.objects.all()
     serializer_class = ParkingFacilitySerializer
@@ -69,13 +234,21 @@ class ParkingFacilityDetail(
 # -------------------parking zone views-------------------
 # parking zone views
 class ParkingZoneList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    BumpOnCreateMixin,
+    SparseFieldsMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     queryset = ParkingZone.objects.all()
     serializer_class = ParkingZoneSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["parking_facility", "name", "code"]
+    bump_topics = [PARKING_TOPIC, DEVICES_TOPIC]
+
+    def written_zone(self, instance):
+        return instance
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -102,13 +275,18 @@ class ParkingZoneDetail(
 # -------------------device views-------------------
 # device views
 class DeviceList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    BumpOnCreateMixin,
+    SparseFieldsMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     queryset = Device.objects.all()
     serializer_class = DeviceSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["parking_zone", "device_code", "is_active"]
+    bump_topics = [PARKING_TOPIC, DEVICES_TOPIC]
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -135,13 +313,28 @@ class DeviceDetail(
 # -------------------telemetry views-------------------
 # telemetry views
 class TelemetryList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    MainTableMixin,
+    ValuesListMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     queryset = Telemetry.objects.all()
     serializer_class = TelemetrySerializer
+    values_serializer_class = TelemetryValuesSerializer
     permission_classes = [AllowAny]
+    timeseries_kind = TimeSeriesPartition.TELEMETRY
+    export_url_name = "telemetry-export"
+    pagination_class = TimeSeriesCursorPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["device__device_code", "voltage", "current", "power_factor"]
+    filterset_fields = {
+        "device": ["exact"],
+        "device__device_code": ["exact"],
+        "voltage": ["exact"],
+        "current": ["exact"],
+        "power_factor": ["exact"],
+        "timestamp": ["gte", "lt"],
+    }
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -151,6 +344,7 @@ class TelemetryList(
 
 
 class TelemetryDetail(
+    MainTableMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -159,37 +353,249 @@ class TelemetryDetail(
     queryset = Telemetry.objects.all()
     serializer_class = TelemetrySerializer
     permission_classes = [AllowAny]
+    timeseries_kind = TimeSeriesPartition.TELEMETRY
+    export_url_name = "telemetry-export"
 
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
 
-# -------------------bulk telemetry views-------------------
-# bulk telemetry views
-class BulkTelemetryList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
-):
-    queryset = Telemetry.objects.all()
-    serializer_class = TelemetryBulkSerializer
+def parse_time_param(value):
+    """ISO 8601 datetime or YYYY-MM-DD (midnight) query param, None if invalid."""
+    dt = parse_datetime(value)
+    if dt is None:
+        d = parse_date(value)
+        if d is None:
+            return None
+        dt = datetime.combine(d, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+# telemetry series (downsampled) view
+class TelemetrySeriesView(APIView):
+    """
+    min/max/avg/count of voltage, current and power_factor per bucket for one
+    device, read from TelemetryRollup. resolution=auto picks the finest
+    resolution that keeps the series under MAX_POINTS buckets.
+    """
+
+    permission_classes = [AllowAny]
+    MAX_POINTS = 1500
+
+    def get(self, request):
+        device_code = request.query_params.get("device_code")
+        start_str = request.query_params.get("start")
+        end_str = request.query_params.get("end")
+        resolution = request.query_params.get("resolution", "auto")
+
+        if not device_code:
+            return Response({"detail": "device_code is required."}, status=400)
+
+        end = parse_time_param(end_str) if end_str else timezone.now()
+        # the default start is derived from end, so end is checked first
+        start = None
+        if end is not None:
+            start = parse_time_param(start_str) if start_str else end - timedelta(days=1)
+        if start is None or end is None:
+            return Response(
+                {"detail": "Invalid start/end. Use ISO 8601 or YYYY-MM-DD."},
+                status=400,
+            )
+        if start >= end:
+            return Response({"detail": "start must be before end."}, status=400)
+
+        steps = {res: step for res, step, _ in TELEMETRY_RESOLUTIONS}
+        if resolution == "auto":
+            resolution = next(
+                (res for res, step in steps.items() if (end - start) / step <= self.MAX_POINTS),
+                TelemetryRollup.DAY,
+            )
+        elif resolution not in steps:
+            return Response(
+                {"detail": f"resolution must be one of auto, {', '.join(steps)}."},
+                status=400,
+            )
+
+        device = Device.objects.filter(device_code=device_code).first()
+        if device is None:
+            raise Http404
+
+        rows = TelemetryRollup.objects.filter(
+            device=device,
+            resolution=resolution,
+            bucket__gte=floor_time(start, steps[resolution]),
+            bucket__lt=end,
+        ).order_by("bucket")
+
+        points = []
+        for r in rows:
+            point = {"bucket": r.bucket, "count": r.samples}
+            for metric in TELEMETRY_METRICS:
+                point[metric] = {
+                    "min": getattr(r, f"{metric}_min"),
+                    "max": getattr(r, f"{metric}_max"),
+                    "avg": getattr(r, f"{metric}_sum") / r.samples,
+                }
+            points.append(point)
+
+        return Response(
+            {
+                "device_code": device_code,
+                "resolution": resolution,
+                "start": start,
+                "end": end,
+                "points": points,
+            }
+        )
+
+
+# -------------------export views-------------------
+class ExportView(APIView):
+    """
+    Streams every matching row as CSV (default) or NDJSON (fmt=ndjson),
+    reading the table in chunks so memory stays flat for any export size.
+    Filters: device_code, zone_code, facility, start/end (timestamp range).
+    """
+
     permission_classes = [AllowAny]
+    export_kind = None
+    export_formats = {
+        "csv": ("text/csv", stream_csv),
+        "ndjson": (NDJSON_CONTENT_TYPE, stream_ndjson),
+    }
+
+    def get(self, request):
+        params = request.query_params
+        fmt = params.get("fmt", "csv")
+        if fmt not in self.export_formats:
+            return Response({"detail": "fmt must be csv or ndjson."}, status=400)
+
+        bounds = {}
+        for name in ("start", "end"):
+            if params.get(name):
+                bounds[name] = parse_time_param(params[name])
+                if bounds[name] is None:
+                    return Response(
+                        {"detail": f"Invalid {name}. Use ISO 8601 or YYYY-MM-DD."},
+                        status=400,
+                    )
+
+        facility = params.get("facility")
+        if facility and not facility.isdigit():
+            return Response({"detail": "Invalid facility. Use its id."}, status=400)
+
+        rows = export_rows(
+            self.export_kind,
+            device_code=params.get("device_code"),
+            zone_code=params.get("zone_code"),
+            facility_id=facility,
+            **bounds,
+        )
+
+        content_type, stream = self.export_formats[fmt]
+        response = StreamingHttpResponse(
+            stream(self.export_kind, rows),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.export_kind}.{fmt}"'
+        )
+        return response
+
+
+class TelemetryExportView(ExportView):
+    export_kind = "telemetry"
+
+
+class ParkingLogExportView(ExportView):
+    export_kind = "parking_log"
 
-    # def get(self, request, *args, **kwargs):
-    #     return self.list(request, *args, **kwargs)
+
+# -------------------bulk ingest views-------------------
+class BulkIngestMixin:
+    """
+    POST a {"records": [...]} JSON batch, or an application/x-ndjson stream
+    with one record per line that is ingested in fixed-size chunks.
+    With ?async=true a JSON batch is queued to Celery and answered with 202.
+    """
+
+    ingest_kind = None
 
     def post(self, request, *args, **kwargs):
-        return self.create(request, *args, **kwargs)
+        is_ndjson = (
+            request.content_type.split(";")[0].strip() == NDJSON_CONTENT_TYPE
+        )
+
+        if request.query_params.get("async") in ("1", "true"):
+            if is_ndjson:
+                return Response(
+                    {"detail": "Async mode is only available for JSON batches."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            envelope = BulkEnvelopeSerializer(data=request.data)
+            envelope.is_valid(raise_exception=True)
+            task = ingest_bulk.delay(
+                self.ingest_kind, envelope.validated_data["records"]
+            )
+            return Response(
+                {
+                    "batch_id": task.id,
+                    "status": "QUEUED",
+                    "status_url": reverse(
+                        "ingest-batch-status", args=[task.id], request=request
+                    ),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        if is_ndjson:
+            if request.stream is None:
+                return Response(
+                    {"detail": "Empty NDJSON body."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            result = ingest_ndjson(request.stream, self.get_serializer_class())
+            return Response(result, status=status.HTTP_201_CREATED)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+# bulk telemetry views
+class BulkTelemetryList(BulkIngestMixin, generics.GenericAPIView):
+    queryset = Telemetry.objects.all()
+    serializer_class = TelemetryBulkSerializer
+    permission_classes = [AllowAny]
+    ingest_kind = "telemetry"
 
 
 # -------------------parking log views-------------------
 # parking log views
 class ParkingLogList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    MainTableMixin,
+    ValuesListMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     queryset = ParkingLog.objects.all()
     serializer_class = ParkingLogSerializer
+    values_serializer_class = ParkingLogValuesSerializer
     permission_classes = [AllowAny]
+    timeseries_kind = TimeSeriesPartition.PARKING_LOG
+    export_url_name = "parking-log-export"
+    pagination_class = TimeSeriesCursorPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["device__device_code", "is_occupied"]
+    filterset_fields = {
+        "device": ["exact"],
+        "device__device_code": ["exact"],
+        "is_occupied": ["exact"],
+        "timestamp": ["gte", "lt"],
+    }
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -200,6 +606,7 @@ class ParkingLogList(
 
 # parking log detail views
 class ParkingLogDetail(
+    MainTableMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -207,18 +614,49 @@ class ParkingLogDetail(
 ):
     queryset = ParkingLog.objects.all()
     serializer_class = ParkingLogSerializer
+    timeseries_kind = TimeSeriesPartition.PARKING_LOG
+    export_url_name = "parking-log-export"
 
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
 
+# bulk parking log views
+class BulkParkingLogList(BulkIngestMixin, generics.GenericAPIView):
+    queryset = ParkingLog.objects.all()
+    serializer_class = ParkingLogBulkSerializer
+    permission_classes = [AllowAny]
+    ingest_kind = "parking_log"
+
+
+# async ingest batch status
+class IngestBatchStatusView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, batch_id):
+        result = AsyncResult(batch_id)
+        data = {"batch_id": batch_id, "status": result.state, "result": None}
+
+        # PENDING also covers unknown ids: Celery cannot tell them apart
+        if result.successful():
+            data["result"] = result.result
+        elif result.failed():
+            data["result"] = {"detail": str(result.result)}
+
+        return Response(data)
+
+
 #  parking target list
 class ParkingTargetList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    BumpOnCreateMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     queryset = ParkingTarget.objects.all()
     serializer_class = ParkingTargetSerializer
     permission_classes = [AllowAny]
+    bump_topics = [PARKING_TOPIC]
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -227,8 +665,90 @@ class ParkingTargetList(
         return self.create(request, *args, **kwargs)
 
 
-class DashboardSummaryList(APIView):
+# -------------------dashboard views-------------------
+class VersionedCacheMixin:
+    """
+    Serves GET from Django's cache, keyed by endpoint, the normalized query
+    params and the version counters of the facility/zone scope the request
+    covers. Ingestion and alert changes bump those versions, so an entry is
+    never served after new data for its scope has arrived.
+
+    The same key is the response ETag, so If-None-Match gets a 304 before
+    anything is computed. Last-Modified (the last bump) is informational
+    only: its one-second resolution cannot tell two bumps in the same second
+    apart, so If-Modified-Since never produces a 304 on its own.
+    """
+
+    cache_endpoint = None
+    # data the response is built from (response_cache *_TOPIC); only writes
+    # to these invalidate it
+    cache_topics = ()
+    cache_params = ("date", "facility", "zone_code")
+    facility_param = "facility"
+    cache_timeout = 300
+    # for responses that also change with the clock (e.g. offline status)
+    cache_bucket_seconds = None
+
+    def get(self, request, *args, **kwargs):
+        params = {
+            name: request.query_params.get(name, "").strip()
+            for name in self.cache_params
+        }
+        scopes = topic_scopes(
+            request_scopes(params[self.facility_param], params["zone_code"]),
+            self.cache_topics,
+        )
+
+        try:
+            versions, last_modified = scope_state(scopes)
+        except Exception:
+            logger.warning("Response cache unavailable, serving uncached", exc_info=True)
+            return self.build_response(request)
+
+        digest = response_digest(
+            self.cache_endpoint, params, scopes, versions, self.cache_bucket_seconds
+        )
+        etag = f'"{digest}"'
+        if last_modified is not None and self.cache_bucket_seconds:
+            bucket_start = int(timezone.now().timestamp()) // self.cache_bucket_seconds
+            last_modified = max(last_modified, bucket_start * self.cache_bucket_seconds)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, last_modified)
+
+        key = response_key(self.cache_endpoint, digest)
+        try:
+            data = cache.get(key)
+        except Exception:
+            logger.warning("Could not read cached response", exc_info=True)
+            data = None
+        if data is not None:
+            return self._with_validators(Response(data), etag, last_modified)
+
+        response = self.build_response(request)
+        if response.status_code == status.HTTP_200_OK:
+            try:
+                cache.set(key, response.data, self.cache_timeout)
+            except Exception:
+                logger.warning("Could not cache response", exc_info=True)
+            self._with_validators(response, etag, last_modified)
+        return response
+
+    def _with_validators(self, response, etag, last_modified):
+        response.headers["ETag"] = etag
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        # let clients keep the body but revalidate on every poll
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class DashboardSummaryList(VersionedCacheMixin, APIView):
     permission_classes = [AllowAny]
+    cache_endpoint = "dashboard-summary"
+    # alerts_triggered_count is not computed yet, so alerts are not read
+    cache_topics = (PARKING_TOPIC,)
 
     def _date_bounds(self, date_str: str):
         d = parse_date(date_str)
@@ -238,7 +758,73 @@ class DashboardSummaryList(APIView):
         end = timezone.make_aware(datetime.combine(d, time.max))
         return start, end, None
 
-    def get(self, request, format=None):
+    def _detached_logs(self, partitions, archived, start, end, devices_qs, scoped):
+        """
+        Logs of [start, end) held in detached monthly partitions or the archive:
+        ({zone_id: events}, {device_id: (zone_id, timestamp, is_occupied)} of
+        each device's latest log), for the devices in scope.
+        """
+        zone_of = dict(devices_qs.values_list("id", "parking_zone_id"))
+        events, latest = {}, {}
+        kind = TimeSeriesPartition.PARKING_LOG
+        columns = ["device_id", "timestamp", "is_occupied"]
+        device_ids = list(zone_of) if scoped else None
+        rows = merge_by_timestamp(
+            1,
+            iter_partition_rows(kind, partitions, columns, device_ids, start, end),
+            iter_archive_rows(kind, columns, device_ids, start, end) if archived else (),
+        )
+        for device_id, ts, occupied in rows:
+            zone_id = zone_of.get(device_id)
+            if zone_id is None:
+                continue
+            events[zone_id] = events.get(zone_id, 0) + 1
+            latest[device_id] = (zone_id, ts, occupied)
+        return events, latest
+
+    def _current_occupancy_by_zone(self, logs_qs, devices_qs, date_str, detached=None):
+        """
+        {zone_id: devices whose latest log (within the filters) says occupied}.
+        Without a date this is read from the DeviceCurrentState table; for a
+        given day it is one correlated subquery on the (device, timestamp) index,
+        merged with the latest logs from detached partitions or the archive.
+        """
+        if not date_str:
+            rows = (
+                DeviceCurrentState.objects.filter(
+                    device__in=devices_qs, is_occupied=True
+                )
+                .values_list("device__parking_zone_id")
+                .annotate(n=Count("device"))
+            )
+            return dict(rows)
+
+        latest_ts = (
+            logs_qs.filter(device_id=OuterRef("device_id"))
+            .order_by("-timestamp")
+            .values("timestamp")[:1]
+        )
+        if detached is None:
+            rows = (
+                logs_qs.filter(is_occupied=True, timestamp=Subquery(latest_ts))
+                .values_list("device__parking_zone_id")
+                .annotate(n=Count("id"))
+            )
+            return dict(rows)
+
+        latest = dict(detached)
+        for device_id, zone_id, ts, occupied in logs_qs.filter(
+            timestamp=Subquery(latest_ts)
+        ).values_list("device_id", "device__parking_zone_id", "timestamp", "is_occupied"):
+            if device_id not in latest or latest[device_id][1] < ts:
+                latest[device_id] = (zone_id, ts, occupied)
+        occupied_by_zone = {}
+        for zone_id, _, occupied in latest.values():
+            if occupied:
+                occupied_by_zone[zone_id] = occupied_by_zone.get(zone_id, 0) + 1
+        return occupied_by_zone
+
+    def build_response(self, request):
         date_str = request.query_params.get("date")  # optional
         facility_id = request.query_params.get("facility")  # optional
         zone_code = request.query_params.get("zone_code")  # optional
@@ -250,11 +836,21 @@ class DashboardSummaryList(APIView):
         # ----------------------------
         # Optional filters
         # ----------------------------
+        partitions, archived = [], False
         if date_str:
             start_dt, end_dt, err = self._date_bounds(date_str)
             if err:
                 return Response({"detail": err}, status=400)
             logs_qs = logs_qs.filter(timestamp__range=(start_dt, end_dt))
+            # a day of a detached month or an archived day is read from its files
+            partitions = partitions_for(TimeSeriesPartition.PARKING_LOG, start_dt, end_dt)
+            archived = is_archived(TimeSeriesPartition.PARKING_LOG, start_dt.date())
+            if partitions or archived:
+                # the files hold the whole day; its rows left in the main
+                # table (or, once archived, in a partition) are being deleted
+                logs_qs = logs_qs.none()
+            if archived:
+                partitions = []
 
         if facility_id:
             logs_qs = logs_qs.filter(
@@ -271,92 +867,77 @@ class DashboardSummaryList(APIView):
             zones_qs = zones_qs.filter(code=zone_code)
 
         # ----------------------------
-        # Top-level KPIs
+        # Zone-wise indicators (only zones in filtered scope), one grouped
+        # query per indicator regardless of the number of zones
         # ----------------------------
-        total_parking_events = logs_qs.count()
+        zones = list(zones_qs.values_list("id", "code"))
 
-        active_devices_count = devices_qs.filter(is_active=True).count()
-
-        latest_by_device = logs_qs.values("device_id").annotate(
-            last_ts=Max("timestamp")
+        events_by_zone = dict(
+            logs_qs.values_list("device__parking_zone_id").annotate(n=Count("id"))
+        )
+        active_by_zone = dict(
+            devices_qs.filter(is_active=True)
+            .values_list("parking_zone_id")
+            .annotate(n=Count("id"))
+        )
+        detached = None
+        if partitions or archived:
+            detached_events, detached = self._detached_logs(
+                partitions,
+                archived,
+                start_dt,
+                end_dt + timedelta(microseconds=1),
+                devices_qs,
+                scoped=bool(facility_id or zone_code),
+            )
+            for zone_id, n in detached_events.items():
+                events_by_zone[zone_id] = events_by_zone.get(zone_id, 0) + n
+        occupied_by_zone = self._current_occupancy_by_zone(
+            logs_qs, devices_qs, date_str, detached
         )
-        pairs = [
-            (r["device_id"], r["last_ts"])
-            for r in latest_by_device
-            if r["last_ts"] is not None
-        ]
-
-        current_occupied_devices = 0
-        if pairs:
-            q = Q()
-            for device_id, ts in pairs:
-                q |= Q(device_id=device_id, timestamp=ts)
-            latest_rows = ParkingLog.objects.filter(q)
-            current_occupied_devices = latest_rows.filter(is_occupied=True).count()
-
-        alerts_triggered_count = 0
 
-        # Target + efficiency (only meaningful when date exists and ParkingTarget exists)
-        target_total = None
-        efficiency = None
-        if date_str and ParkingTarget is not None:
-            target_total = (
-                ParkingTarget.objects.filter(date=date_str)
-                .filter(parking_zone__in=zones_qs)
-                .aggregate(total=Sum("target_parking_events"))["total"]
-            ) or 0
-            if target_total > 0:
-                efficiency = round((total_parking_events / target_total) * 100, 2)
-        else:
-            target_total = None
-            efficiency = None
+        # Target + efficiency (only meaningful when date exists)
+        targets_by_zone = {}
+        if date_str:
+            targets_by_zone = dict(
+                ParkingTarget.objects.filter(
+                    date=date_str, parking_zone__in=zones_qs
+                ).values_list("parking_zone_id", "target_parking_events")
+            )
 
-        # ----------------------------
-        # Zone-wise indicators (only zones in filtered scope)
-        # ----------------------------
         zone_wise_indicators = {}
-        for zone in zones_qs:
-            zone_logs = logs_qs.filter(device__parking_zone=zone)
-
-            zone_total = zone_logs.count()
-
-            z_latest = zone_logs.values("device_id").annotate(last_ts=Max("timestamp"))
-            z_pairs = [
-                (r["device_id"], r["last_ts"])
-                for r in z_latest
-                if r["last_ts"] is not None
-            ]
-
-            zone_current_occ = 0
-            if z_pairs:
-                zq = Q()
-                for did, ts in z_pairs:
-                    zq |= Q(device_id=did, timestamp=ts)
-                z_latest_rows = ParkingLog.objects.filter(zq)
-                zone_current_occ = z_latest_rows.filter(is_occupied=True).count()
-
-            zone_target = None
+        for zone_id, z_code in zones:
+            zone_total = events_by_zone.get(zone_id, 0)
+            zone_target = targets_by_zone.get(zone_id) if date_str else None
             zone_eff = None
-            if date_str and ParkingTarget is not None:
-                zone_target = (
-                    ParkingTarget.objects.filter(date=date_str, parking_zone=zone)
-                    .values_list("target_parking_events", flat=True)
-                    .first()
-                )
-                if zone_target and zone_target > 0:
-                    zone_eff = round((zone_total / zone_target) * 100, 2)
+            if zone_target and zone_target > 0:
+                zone_eff = round((zone_total / zone_target) * 100, 2)
 
-            zone_wise_indicators[zone.code] = {
+            zone_wise_indicators[z_code] = {
                 "total_parking_events": zone_total,
-                "current_occupancy_count": zone_current_occ,
-                "active_devices_count": devices_qs.filter(
-                    parking_zone=zone, is_active=True
-                ).count(),
+                "current_occupancy_count": occupied_by_zone.get(zone_id, 0),
+                "active_devices_count": active_by_zone.get(zone_id, 0),
                 "alerts_triggered_count": 0,
                 "target_parking_events": zone_target,
                 "efficiency": zone_eff,
             }
 
+        # ----------------------------
+        # Top-level KPIs: every log/device/target in scope belongs to one of
+        # the scoped zones, so the totals are the sums of the zone rows
+        # ----------------------------
+        total_parking_events = sum(events_by_zone.values())
+        active_devices_count = sum(active_by_zone.values())
+        current_occupied_devices = sum(occupied_by_zone.values())
+        alerts_triggered_count = 0
+
+        target_total = None
+        efficiency = None
+        if date_str:
+            target_total = sum(targets_by_zone.values())
+            if target_total > 0:
+                efficiency = round((total_parking_events / target_total) * 100, 2)
+
         return Response(
             {
                 "total_parking_events": total_parking_events,
@@ -374,8 +955,12 @@ class DashboardSummaryList(APIView):
 # hourly usage view
 
 
-class HourlyUsageView(APIView):
+class HourlyUsageView(VersionedCacheMixin, APIView):
     permission_classes = [AllowAny]
+    cache_endpoint = "hourly-usage"
+    cache_topics = (PARKING_TOPIC,)
+    cache_params = ("date", "facility_id", "zone_code")
+    facility_param = "facility_id"
 
     def _date_bounds(self, date_str: str):
         d = parse_date(date_str)
@@ -385,33 +970,33 @@ class HourlyUsageView(APIView):
         end = timezone.make_aware(datetime.combine(d, time.max))
         return start, end, None
 
-    def get(self, request):
+    def build_response(self, request):
         date_str = request.query_params.get("date")
         facility_id = request.query_params.get("facility_id")
         zone_code = request.query_params.get("zone_code")
-        qs = ParkingLog.objects.all()
+        # served from the (device, hour) rollup maintained at ingest time
+        qs = ParkingLogHourly.objects.all()
 
         # ---- optional date filter ----
         if date_str:
             start_dt, end_dt, err = self._date_bounds(date_str)
             if err:
                 return Response({"detail": err}, status=400)
-            qs = qs.filter(timestamp__range=(start_dt, end_dt))
+            qs = qs.filter(hour__range=(start_dt, end_dt))
 
         # ---- optional facility filter ----
         if facility_id:
-            qs = qs.filter(device__parking_zone__parking_facility_id=facility_id)
+            qs = qs.filter(parking_zone__parking_facility_id=facility_id)
 
         # ---- optional zone filter ----
         if zone_code:
-            qs = qs.filter(device__parking_zone__code=zone_code)
+            qs = qs.filter(parking_zone__code=zone_code)
 
         data = (
-            qs.annotate(hour=TruncHour("timestamp"))
-            .values("hour")
+            qs.values("hour")
             .annotate(
-                total_events=Count("id"),
-                occupied_events=Count("id", filter=Q(is_occupied=True)),
+                total_events=Sum("total_events"),
+                occupied_events=Sum("occupied_events"),
             )
             .order_by("hour")
         )
@@ -426,12 +1011,13 @@ class HourlyUsageView(APIView):
 # -------------------alert views-------------------
 
 
-class AlertList(generics.ListAPIView):
+class AlertList(ValuesListMixin, generics.ListAPIView):
     queryset = Alert.objects.all().order_by("-last_triggered_at")
     serializer_class = AlertSerializer
+    values_serializer_class = AlertValuesSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["status", "severity", "alert_type", "device__device_code"]
+    filterset_class = AlertFilter
 
 
 class AlertAcknowledgeView(APIView):
@@ -441,6 +1027,7 @@ class AlertAcknowledgeView(APIView):
         alert = Alert.objects.get(pk=pk)
         alert.status = Alert.ACK
         alert.save(update_fields=["status", "updated_at"])
+        bump_devices([alert.device_id], [ALERTS_TOPIC])
         return Response(AlertSerializer(alert).data)
 
 
@@ -450,17 +1037,78 @@ class AlertResolveView(APIView):
     def patch(self, request, pk):
         alert = Alert.objects.get(pk=pk)
         alert.status = Alert.RESOLVED
-        alert.save(update_fields=["status", "updated_at"])
+        alert.resolved_at = timezone.now()
+        alert.save(update_fields=["status", "resolved_at", "updated_at"])
+        bump_devices([alert.device_id], [ALERTS_TOPIC])
         return Response(AlertSerializer(alert).data)
 
 
+# bulk acknowledge/resolve: ids in the body and/or the alert list filters in
+# the query string, applied with one UPDATE
+class AlertBulkActionView(APIView):
+    permission_classes = [AllowAny]
+    # statuses the action applies to; other matching alerts are left alone
+    from_statuses = []
+    # status the alerts move to, and the fields stamped with the time of it
+    to_status = None
+    stamped_fields = ["updated_at"]
+
+    def patch(self, request):
+        body = AlertBulkActionSerializer(data=request.data)
+        body.is_valid(raise_exception=True)
+        ids = body.validated_data.get("ids")
+
+        filterset = AlertFilter(request.query_params, queryset=Alert.objects.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not ids and not any(request.query_params.get(name) for name in filterset.filters):
+            return Response(
+                {"detail": "Pass alert ids or at least one filter."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        qs = filterset.qs.filter(status__in=self.from_statuses)
+        if ids:
+            qs = qs.filter(pk__in=ids)
+
+        zones = set(
+            qs.values_list(
+                "device__parking_zone__code",
+                "device__parking_zone__parking_facility_id",
+            ).distinct()
+        )
+        now = timezone.now()
+        updated = qs.update(
+            status=self.to_status, **{name: now for name in self.stamped_fields}
+        )
+        if updated:
+            bump_zones(zones, [ALERTS_TOPIC])
+        return Response({"updated": updated})
+
+
+class AlertBulkAcknowledgeView(AlertBulkActionView):
+    from_statuses = [Alert.ACTIVE]
+    to_status = Alert.ACK
+
+
+class AlertBulkResolveView(AlertBulkActionView):
+    from_statuses = [Alert.ACTIVE, Alert.ACK]
+    to_status = Alert.RESOLVED
+    stamped_fields = ["resolved_at", "updated_at"]
+
+
 # device status view (for dashboard)
 
 
-class DeviceStatusView(APIView):
+class DeviceStatusView(VersionedCacheMixin, APIView):
     permission_classes = [AllowAny]
+    cache_endpoint = "device-status"
+    cache_topics = (DEVICES_TOPIC, ALERTS_TOPIC)
+    cache_params = ("facility", "zone_code")
+    # OFFLINE depends on the clock, not only on new data
+    cache_bucket_seconds = 10
 
-    def get(self, request):
+    def build_response(self, request):
         zone_code = request.query_params.get("zone_code")
         facility_id = request.query_params.get("facility")
 
@@ -0,0 +1,5 @@
+# make sure the Celery app is loaded when Django starts so shared_task
+# (and .delay() from the API) uses the configured broker
+from .celery import app as celery_app
+
+__all__ = ("celery_app",)
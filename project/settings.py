@@ -83,6 +83,26 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # run on every new connection: WAL lets readers work while a write
+            # is in progress, NORMAL only syncs at checkpoints in WAL mode,
+            # 256 MiB of the file is memory-mapped and 64 MiB of page cache
+            # kept per connection
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA mmap_size=268435456;"
+                "PRAGMA cache_size=-65536;"
+                "PRAGMA busy_timeout=20000;"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+            # take the write lock at BEGIN: a deferred transaction upgrading
+            # from read to write fails at once with "database is locked"
+            # instead of waiting for busy_timeout
+            "transaction_mode": "IMMEDIATE",
+            # seconds, same as busy_timeout above
+            "timeout": 20,
+        },
     }
 }
 
@@ -144,14 +164,70 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Asia/Dhaka"
+# lets async ingest batches report STARTED while they are being written
+CELERY_TASK_TRACK_STARTED = True
 
 
 CELERY_BEAT_SCHEDULE = {
-    "check-device-offline-every-minute": {
-        "task": "api.tasks.check_device_offline",
-        "schedule": crontab(minute="*/1"),
+    # cheap to run often: only devices whose offline deadline passed are read
+    "check-device-offline": {
+        "task": "apps.parking.tasks.check_device_offline",
+        "schedule": 10.0,
+    },
+    "flush-heartbeats": {
+        "task": "apps.parking.tasks.flush_heartbeats",
+        "schedule": 5.0,
+    },
+    "prune-timeseries": {
+        "task": "apps.parking.tasks.prune_timeseries",
+        "schedule": crontab(hour=3, minute=30),
     },
+    "archive-timeseries-days": {
+        "task": "apps.parking.tasks.archive_timeseries_days",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "detach-timeseries-months": {
+        "task": "apps.parking.tasks.detach_timeseries_months",
+        "schedule": crontab(day_of_month=1, hour=4, minute=0),
+    },
+}
+
+
+# shared cache: dashboard responses and their per facility/zone version counters
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/2",
+    }
+}
+
+
+# Device.last_seen heartbeat buffer: "redis" (shared) or "memory" (per process)
+HEARTBEAT_BUFFER_BACKEND = "redis"
+HEARTBEAT_BUFFER_REDIS_URL = "redis://127.0.0.1:6379/1"
+# seconds; the memory buffer flushes itself on the next heartbeat after this
+HEARTBEAT_FLUSH_INTERVAL = 5
+
+# run ingest writes on one writer thread per process that commits concurrent
+# batches together; off, each request commits its own batch
+INGEST_SINGLE_WRITER = True
+# seconds a request waits for the writer before failing its batch
+INGEST_WRITE_TIMEOUT = 30
+
+# days of raw rows kept by prune_timeseries; older rows only live on in the
+# TelemetryRollup / ParkingLogHourly tables
+TIMESERIES_RETENTION = {
+    "telemetry": 90,
+    "parking_log": 365,
 }
+# closed months kept in the main tables; older months are moved to one SQLite
+# file per table and month under TIMESERIES_PARTITION_DIR
+TIMESERIES_HOT_MONTHS = 1
+TIMESERIES_PARTITION_DIR = BASE_DIR / "partitions"
+# days older than this leave the row stores for the columnar .npy archive
+# (kept until removed by hand); set it below TIMESERIES_RETENTION to keep them
+TIMESERIES_ARCHIVE_AFTER_DAYS = 60
+TIMESERIES_ARCHIVE_DIR = BASE_DIR / "archive"
 
 
 